@@ -0,0 +1,76 @@
+import pandas as pd
+import streamlit as st
+
+from dados.cache import get_result_cache, get_single_flight
+from dados.cnpj import get_negative_cache
+from dados.conexao import get_pool
+from dados.memoria import get_session_frames
+from dados.metricas import get_metrics, is_admin, rss_bytes
+
+st.set_page_config(page_title="Diagnóstico - Sistema Web Empresa", page_icon="logo_fgv.png", layout='wide')
+
+if not is_admin():
+    st.error("Página restrita aos administradores.")
+    st.stop()
+
+metrics = get_metrics()
+
+st.title("Diagnóstico")
+st.caption(f"Memória residente do processo: {rss_bytes() / 2**20:,.0f} MB".replace(",", "."))
+
+# --- latências por página e etapa ---
+with st.container(border=True):
+    st.subheader("Latências (ms) por página e etapa")
+    st.caption(
+        "page: execução inteira da página · connect: abertura de conexão · execute: consulta no "
+        "Snowflake · fetch/frame: leitura Arrow e montagem do DataFrame · stream: leitura em lotes · "
+        "export: geração de arquivo · grid: renderização do AgGrid · cache:*: leituras com cache"
+    )
+    latencias = pd.DataFrame(metrics.percentiles())
+    if latencias.empty:
+        st.info("Ainda não há eventos registrados.")
+    else:
+        st.dataframe(latencias, hide_index=True, use_container_width=True)
+
+# --- caches e pool ---
+c1, c2, c3, c4 = st.columns(4)
+with c1.container(border=True):
+    st.subheader("Cache de resultados")
+    st.json(get_result_cache().stats())
+with c2.container(border=True):
+    st.subheader("Cache negativo (CNPJ)")
+    st.json(get_negative_cache().stats())
+with c3.container(border=True):
+    st.subheader("Pool de conexões")
+    pool = get_pool().stats()
+    pool.pop("checkouts")
+    st.json(pool)
+with c4.container(border=True):
+    st.subheader("Consultas compartilhadas")
+    st.caption("coalesced: execuções evitadas porque outra sessão já rodava a mesma consulta ou exportação")
+    st.json(get_single_flight().stats())
+
+# --- memória das sessões ---
+with st.container(border=True):
+    st.subheader("Resultados guardados pelas sessões")
+    sessoes = get_session_frames().stats()
+    por_sessao = pd.DataFrame(sessoes.pop("per_session"))
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Em memória (MB)", f"{sessoes['bytes'] / 2**20:,.1f}", help=f"Limite: {sessoes['max_bytes'] / 2**20:,.0f} MB")
+    m2.metric("Sessões", sessoes["sessions"])
+    m3.metric("Resultados em disco", f"{sessoes['spilled']} de {sessoes['frames']}")
+    m4.metric("Sessões descartadas", sessoes["evicted_sessions"])
+    st.caption(f"Despejos em disco: {sessoes['spills']} · releituras: {sessoes['reloads']}")
+    if not por_sessao.empty:
+        st.dataframe(por_sessao, hide_index=True, use_container_width=True)
+
+# --- eventos recentes ---
+with st.container(border=True):
+    st.subheader("Eventos recentes")
+    eventos = pd.DataFrame(metrics.recent(200))
+    if not eventos.empty:
+        eventos["ts"] = pd.to_datetime(eventos["ts"], unit="s")
+        st.dataframe(eventos, hide_index=True, use_container_width=True)
+    if st.button("Limpar métricas", key="clear_metrics"):
+        metrics.clear()
+        st.rerun()
@@ -1,14 +1,19 @@
 import streamlit as st
 
+from dados.aquecimento import start_warm_up
+from dados.metricas import is_admin, set_page, timed
+
 
 
 def main():
     st.logo('logo_ibre.png')
+    start_warm_up()
     about = st.Page("home/sobre.py", title="Sobre", icon=":material/double_arrow:")
     
     cnae_uf = st.Page("consulta/cnae_uf.py", title="CNAE & UF", icon=":material/double_arrow:")
     cnae_cities = st.Page("consulta/cnae_cidades.py", title="CNAE & Cidades", icon=":material/double_arrow:")
     cnpj = st.Page("consulta/cnpj.py", title="CNPJ", icon=":material/double_arrow:")
+    nome = st.Page("consulta/nome.py", title="Nome", icon=":material/double_arrow:")
     
     overview = st.Page("overview/visao_geral.py", title="Visão Geral", icon=":material/double_arrow:")
     
@@ -17,17 +22,23 @@ def main():
     data_dict = st.Page("layout/dicionario_dados.py", title="Dicionário de Dados", icon=":material/double_arrow:")
     
     
-    pg = st.navigation(
-        {
-            "Home": [about],
-            "Consulta": [cnae_uf, cnae_cities, cnpj],
-            "Overview": [overview],
-            "Códigos CNAE": [cnae_codes],
-            "Layout": [data_dict]
-        }
-    )
-    
-    pg.run()
+    pages = {
+        "Home": [about],
+        "Consulta": [cnae_uf, cnae_cities, cnpj, nome],
+        "Overview": [overview],
+        "Códigos CNAE": [cnae_codes],
+        "Layout": [data_dict]
+    }
+    if is_admin():
+        diagnostics = st.Page("admin/diagnostico.py", title="Diagnóstico", icon=":material/monitoring:")
+        pages["Admin"] = [diagnostics]
+
+    pg = st.navigation(pages)
+
+    # toda execução de página vira um evento "page" (ver dados/metricas.py)
+    set_page(pg.title)
+    with timed("page"):
+        pg.run()
 
 
 if __name__ == '__main__':
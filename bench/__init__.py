@@ -0,0 +1,4 @@
+"""
+Gerador de dados sintéticos e benchmark das páginas sobre o backend local
+(DuckDB). Requer o pacote duckdb, que não faz parte do requirements.txt.
+"""
@@ -0,0 +1,208 @@
+"""
+Benchmark das páginas sobre o backend local (DuckDB), sem Snowflake.
+
+    python -m bench.dados_sinteticos --rows 5000000
+    python -m bench.benchmark --db bench/swe.duckdb --repeat 5 --output bench/resultado.json
+    python -m bench.benchmark --baseline bench/resultado.json --tolerance 0.2
+
+Cada cenário roda num processo próprio: a página é executada com o AppTest
+do Streamlit, primeiro a frio (caches vazios) e depois `--repeat` vezes a
+quente. São medidos o tempo de cada execução e o pico de memória residente
+do processo. Com --baseline, o comando falha se algum cenário ficar mais
+lento (p50 a quente) ou mais pesado que o permitido por --tolerance.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+# --- Cenários ----------------------------------------------------------------
+def _wait_job(at, timeout=120):
+    """Reexecuta a página enquanto houver uma pesquisa em segundo plano."""
+    deadline = time.monotonic() + timeout
+    while any("linhas lidas" in info.value for info in at.info):
+        if time.monotonic() > deadline:
+            raise TimeoutError("pesquisa não terminou")
+        time.sleep(0.05)
+        at.run()
+
+
+def _sample(sql):
+    from dados.leitura import read_frame
+    return read_frame(sql)
+
+
+def scenario_sobre(at):
+    pass
+
+
+def scenario_visao_geral(at):
+    pass
+
+
+def scenario_tabela_cnae(at):
+    at.text_input[0].set_value("comercio alimentos").run()
+
+
+def scenario_cnae_uf(at):
+    # uma divisão inteira e duas subclasses da árvore CNAE
+    codes = list(_sample("SELECT CNAE_FISCAL FROM TB_MVP_CONS GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT 3")["CNAE_FISCAL"])
+    at.multiselect(key="cnae_select_uf").set_value([codes[0][:2], *codes[1:]])
+    at.multiselect(key="uf_select_uf").set_value(["SP", "RJ"])
+    at.button(key="search_uf_btn").click().run()
+    _wait_job(at)
+    at.selectbox(key="page_uf").set_value(3).run()
+
+
+def scenario_cnae_cidades_sem_filtro(at):
+    at.button(key="search_city_btn").click().run()
+    _wait_job(at)
+
+
+def scenario_cnpj(at):
+    cnpj = _sample("SELECT CNPJ FROM TB_MVP_CONS LIMIT 1 OFFSET 1000")["CNPJ"].iloc[0]
+    at.text_input(key="input_cnpj").set_value(cnpj)
+    at.button(key="search_cnpj").click().run()
+
+
+def scenario_nome(at):
+    at.text_input(key="termo_nome").set_value("padaria estrela")
+    at.button(key="search_nome_btn").click().run()
+
+
+# nome -> (página, ações depois da primeira execução)
+SCENARIOS = {
+    "sobre": ("home/sobre.py", scenario_sobre),
+    "visao_geral": ("overview/visao_geral.py", scenario_visao_geral),
+    "tabela_cnae": ("codigos_cnae/tabela_completa.py", scenario_tabela_cnae),
+    "cnae_uf": ("consulta/cnae_uf.py", scenario_cnae_uf),
+    "cnae_cidades_sem_filtro": ("consulta/cnae_cidades.py", scenario_cnae_cidades_sem_filtro),
+    "cnpj": ("consulta/cnpj.py", scenario_cnpj),
+    "nome": ("consulta/nome.py", scenario_nome),
+}
+
+
+def _prepare_name_index():
+    """O cenário "nome" precisa do índice de nomes; gerado uma vez por banco."""
+    from dados.busca_nome import DOC_COLUMNS, get_name_index, rebuild_name_index
+    from dados.cache import data_version
+    from dados.leitura import iter_arrow
+
+    index = get_name_index()
+    if index is None or index.meta["version"] != data_version():
+        rebuild_name_index(data_version(), iter_arrow(f"SELECT {', '.join(DOC_COLUMNS)} FROM TB_MVP_CONS"))
+
+
+def run_scenario(name, repeat):
+    """Executa um cenário neste processo e devolve as medidas."""
+    from streamlit.testing.v1 import AppTest
+
+    page, actions = SCENARIOS[name]
+    if name == "nome":
+        _prepare_name_index()
+    timings = []
+    for _ in range(repeat + 1):
+        at = AppTest.from_file(str(ROOT / page), default_timeout=300)
+        started = time.perf_counter()
+        at.run()
+        actions(at)
+        timings.append((time.perf_counter() - started) * 1000)
+        if at.exception:
+            raise RuntimeError(f"{name}: {at.exception[0].message}")
+    warm = np.array(timings[1:] or timings)
+    return {
+        "scenario": name,
+        "cold_ms": round(timings[0], 1),
+        "warm_p50_ms": round(float(np.percentile(warm, 50)), 1),
+        "warm_p95_ms": round(float(np.percentile(warm, 95)), 1),
+        # ru_maxrss vem em KB no Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+# --- Execução e relatório ----------------------------------------------------
+def _environment(args, workdir):
+    env = dict(os.environ)
+    env.update({
+        "SWE_BACKEND": "duckdb",
+        "SWE_DUCKDB_PATH": str(Path(args.db).resolve()),
+        "SWE_SNAPSHOT_DIR": str(Path(workdir) / "snapshot"),
+        "SWE_EXPORT_DIR": str(Path(workdir) / "exports"),
+        "PYTHONPATH": str(ROOT),
+    })
+    return env
+
+
+def compare(results, baseline, tolerance):
+    """Cenários que pioraram mais que `tolerance` (fração) em relação à base."""
+    base = {r["scenario"]: r for r in baseline}
+    regressions = []
+    for r in results:
+        old = base.get(r["scenario"])
+        if old is None:
+            continue
+        for metric in ("warm_p50_ms", "peak_rss_mb"):
+            if r[metric] > old[metric] * (1 + tolerance):
+                regressions.append(f"{r['scenario']}: {metric} {old[metric]} -> {r[metric]}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="bench/swe.duckdb")
+    parser.add_argument("--scenarios", nargs="*", default=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output")
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--workdir", help="pasta de snapshot/exportações (padrão: temporária)")
+    parser.add_argument("--run-one", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        print(json.dumps(run_scenario(args.run_one, args.repeat)))
+        return
+
+    if not Path(args.db).exists():
+        sys.exit(f"Banco {args.db} não encontrado; gere com python -m bench.dados_sinteticos")
+    workdir = args.workdir or tempfile.mkdtemp(prefix="swe-bench-")
+    env = _environment(args, workdir)
+    results = []
+    print(f"{'cenário':<26}{'frio ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'pico MB':>10}")
+    for name in args.scenarios:
+        proc = subprocess.run(
+            [sys.executable, "-m", "bench.benchmark", "--run-one", name, "--repeat", str(args.repeat)],
+            cwd=ROOT, env=env, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            print(f"{name:<26}FALHOU\n{proc.stderr[-2000:]}")
+            continue
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        results.append(result)
+        print(f"{name:<26}{result['cold_ms']:>10}{result['warm_p50_ms']:>10}"
+              f"{result['warm_p95_ms']:>10}{result['peak_rss_mb']:>10}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text(encoding="utf-8")), args.tolerance)
+        if regressions:
+            print("\nRegressões:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+    if len(results) < len(args.scenarios):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Gera um banco DuckDB sintético com as tabelas do app, para o backend local.
+
+    python -m bench.dados_sinteticos --rows 10000000 --out bench/swe.duckdb
+
+TB_MVP_CONS é gerada em blocos de `--chunk` linhas com numpy (memória
+constante, qualquer que seja --rows); as demais tabelas saem dela ou das
+listas de referência. Os CNPJs têm dígitos verificadores válidos.
+"""
+import argparse
+import datetime
+import time
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pyarrow as pa
+
+from dados.cnpj import DV_WEIGHTS_1, DV_WEIGHTS_2
+
+
+UFS = (
+    "AC", "AL", "AM", "AP", "BA", "CE", "DF", "ES", "GO", "MA", "MG", "MS", "MT", "PA",
+    "PB", "PE", "PI", "PR", "RJ", "RN", "RO", "RR", "RS", "SC", "SE", "SP", "TO",
+)
+# peso aproximado de cada UF no cadastro
+UF_WEIGHTS = (
+    1, 3, 3, 1, 12, 8, 6, 4, 7, 4, 22, 3, 4, 5, 3, 8, 3, 12, 17, 3, 2, 1, 13, 9, 2, 50, 2,
+)
+
+WORDS = (
+    "Alfa", "Brasil", "Central", "Comercial", "Distribuidora", "Estrela", "Global", "Horizonte",
+    "Ideal", "Jardim", "Líder", "Mercado", "Nacional", "Nova", "Oeste", "Paulista", "Real",
+    "São José", "Santa Maria", "Serviços", "Sul", "Técnica", "União", "Vale", "Vitória",
+    "Padaria", "Farmácia", "Auto Peças", "Construções", "Confecções", "Transportes", "Açaí",
+)
+SUFFIXES = ("LTDA", "ME", "EIRELI", "S.A.", "EPP", "")
+ACTIVITIES = (
+    "Comércio varejista", "Comércio atacadista", "Fabricação", "Serviços", "Transporte",
+    "Cultivo", "Construção", "Atividades", "Manutenção", "Instalação",
+)
+OBJECTS = (
+    "de alimentos", "de vestuário", "de máquinas", "de produtos farmacêuticos", "de veículos",
+    "de móveis", "de materiais de construção", "de bebidas", "de equipamentos", "de cereais",
+)
+
+
+# --- Tabelas de referência ---------------------------------------------------
+def reference(rng, n_cnaes=1300, n_municipios=5570):
+    codes = np.sort(rng.choice(np.arange(111301, 9900000), size=n_cnaes, replace=False))
+    cnae_codes = np.char.zfill(codes.astype(str), 7)
+    descr = [
+        f"{ACTIVITIES[i % len(ACTIVITIES)]} {OBJECTS[(i // len(ACTIVITIES)) % len(OBJECTS)]} {i}"
+        for i in range(n_cnaes)
+    ]
+    cnaes = pa.table({
+        "CODIGO": cnae_codes,
+        "DESCRICAO": descr,
+        "CODIGO_DESCR": [f"{c} - {d}" for c, d in zip(cnae_codes, descr)],
+    })
+
+    weights = np.array(UF_WEIGHTS, dtype=float)
+    per_uf = np.maximum(1, np.round(weights / weights.sum() * n_municipios)).astype(int)
+    municipios = pa.table({
+        "UF": [uf for uf, n in zip(UFS, per_uf) for _ in range(n)],
+        "MUNICIPIO": [f"MUNICIPIO {uf} {k:04d}" for uf, n in zip(UFS, per_uf) for k in range(n)],
+    })
+    return cnaes, municipios, per_uf
+
+
+def check_digits(base):
+    """Dígitos verificadores de uma matriz (n, 12) de dígitos da base do CNPJ."""
+    first = (base * np.array(DV_WEIGHTS_1)).sum(axis=1) % 11
+    first = np.where(first < 2, 0, 11 - first)
+    full = np.column_stack([base, first])
+    second = (full * np.array(DV_WEIGHTS_2)).sum(axis=1) % 11
+    second = np.where(second < 2, 0, 11 - second)
+    return first, second
+
+
+def _pick(rng, values, n, p=None):
+    return np.asarray(values, dtype=object)[rng.choice(len(values), size=n, p=p)]
+
+
+def empresas_chunk(rng, start, n, cnaes, per_uf):
+    """Bloco de `n` linhas de TB_MVP_CONS a partir do id `start`."""
+    # multiplicação por um número primo com 10**12: ids distintos -> bases distintas
+    ids = np.arange(start + 1, start + n + 1, dtype=np.int64)
+    base_num = (ids * 7_919_891) % 10**12
+    base = (base_num[:, None] // 10 ** np.arange(11, -1, -1)) % 10
+    first, second = check_digits(base)
+    cnpj = np.char.add(np.char.zfill(base_num.astype(str), 12), np.char.add(first.astype(str), second.astype(str)))
+
+    weights = np.array(UF_WEIGHTS, dtype=float)
+    uf_idx = rng.choice(len(UFS), size=n, p=weights / weights.sum())
+    mun_idx = (rng.random(n) ** 2 * per_uf[uf_idx]).astype(int)  # poucas cidades grandes
+    uf = np.asarray(UFS, dtype=object)[uf_idx]
+    municipio = np.array([f"MUNICIPIO {u} {m:04d}" for u, m in zip(uf, mun_idx)], dtype=object)
+
+    n_cnaes = cnaes.num_rows
+    zipf = 1 / np.arange(1, n_cnaes + 1) ** 0.8
+    cnae_idx = rng.choice(n_cnaes, size=n, p=zipf / zipf.sum())
+    codigo = cnaes.column("CODIGO").to_numpy(zero_copy_only=False)[cnae_idx]
+    codigo_descr = cnaes.column("CODIGO_DESCR").to_numpy(zero_copy_only=False)[cnae_idx]
+
+    razao = (
+        _pick(rng, WORDS, n) + " " + _pick(rng, WORDS, n) + " " + _pick(rng, SUFFIXES, n)
+    )
+    fantasia = _pick(rng, WORDS, n) + " " + _pick(rng, WORDS, n)
+    sem_fantasia = rng.random(n) < 0.4
+
+    return pa.table({
+        "CNPJ": cnpj,
+        "NOME_FANTASIA": pa.array(fantasia, type=pa.string(), mask=sem_fantasia),
+        "RAZAO_SOCIAL": pa.array([r.strip() for r in razao], type=pa.string()),
+        "MATRIZ_FILIAL": _pick(rng, ("1", "2"), n, p=(0.9, 0.1)).astype(str),
+        "PORTE": _pick(rng, ("00", "01", "03", "05"), n, p=(0.05, 0.7, 0.15, 0.1)).astype(str),
+        "CAPITAL": np.round(rng.lognormal(10, 2, size=n), 2),
+        "SITUACAO": np.full(n, "2"),
+        "CNAE_FISCAL": codigo.astype(str),
+        "CNAE_DESCR": codigo_descr.astype(str),
+        "CNAE_SECUNDARIO": pa.nulls(n, pa.string()),
+        "LOGRADOURO": ("RUA " + _pick(rng, WORDS, n)).astype(str),
+        "NUMERO": rng.integers(1, 5000, size=n).astype(str),
+        "COMPLEMENTO": pa.nulls(n, pa.string()),
+        "BAIRRO": ("BAIRRO " + _pick(rng, WORDS, n)).astype(str),
+        "CEP": np.char.zfill(rng.integers(1_000_000, 99_999_999, size=n).astype(str), 8),
+        "UF": uf.astype(str),
+        "MUNICIPIO": municipio.astype(str),
+        "DDD_1": rng.integers(11, 99, size=n).astype(str),
+        "TELEFONE_1": rng.integers(20_000_000, 99_999_999, size=n).astype(str),
+        "DDD_2": pa.nulls(n, pa.string()),
+        "TELEFONE_2": pa.nulls(n, pa.string()),
+        "EMAIL": pa.array(np.char.add(cnpj, "@exemplo.com.br"), type=pa.string()),
+    })
+
+
+# --- Geração do banco --------------------------------------------------------
+def generate(out, rows, chunk=1_000_000, seed=42):
+    """Cria (ou recria) o banco `out` com `rows` empresas e devolve o caminho."""
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.unlink(missing_ok=True)
+    rng = np.random.default_rng(seed)
+    cnaes, municipios, per_uf = reference(rng)
+
+    con = duckdb.connect(str(out))
+    try:
+        con.execute("CREATE TABLE TB_CNAE_DESCR AS SELECT * FROM cnaes")
+        con.execute("CREATE TABLE TB_UF_MUNICIPIO AS SELECT * FROM municipios")
+        for start in range(0, rows, chunk):
+            part = empresas_chunk(rng, start, min(chunk, rows - start), cnaes, per_uf)
+            if start == 0:
+                con.execute("CREATE TABLE TB_MVP_CONS AS SELECT * FROM part")
+            else:
+                con.execute("INSERT INTO TB_MVP_CONS SELECT * FROM part")
+        con.execute("""
+            CREATE TABLE TB_CNAE_UF AS
+            SELECT CNAE_DESCR, UF, COUNT(*) AS COUNTER FROM TB_MVP_CONS GROUP BY ALL
+        """)
+        con.execute("""
+            CREATE TABLE TB_CNAE_UF_MUNICIPIO AS
+            SELECT CNAE_DESCR, UF, MUNICIPIO, COUNT(*) AS COUNTER FROM TB_MVP_CONS GROUP BY ALL
+        """)
+        stamp = datetime.datetime.now().replace(microsecond=0)
+        con.execute("""
+            CREATE TABLE SWE_TABLE_VERSIONS AS
+            SELECT current_schema() AS TABLE_SCHEMA, table_name AS TABLE_NAME, ?::TIMESTAMP AS LAST_ALTERED
+            FROM duckdb_tables() WHERE table_name LIKE 'TB_%'
+        """, [stamp])
+    finally:
+        con.close()
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--out", default="bench/swe.duckdb")
+    parser.add_argument("--chunk", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    started = time.perf_counter()
+    path = generate(args.out, args.rows, args.chunk, args.seed)
+    print(f"{args.rows:,} empresas em {path} ({time.perf_counter() - started:.0f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import streamlit as st
-import pandas as pd
-import snowflake.connector
+import math
+
+from dados.busca import CodeTextIndex
+from dados.snapshot import current_version, load_table
 
 st.set_page_config(
     page_title="Tabela Completa - Sistema Web Empresa", 
@@ -21,53 +23,55 @@ st.markdown(
     unsafe_allow_html=True
 )  # necessário para que o iframe do pagination ganhe altura :contentReference[oaicite:0]{index=0}
 
-# --- Conexão com o banco ---------------------------------------------------
-def get_connection():
-    return snowflake.connector.connect(
-        account   = st.secrets["snowflake"]["account"],
-        user      = st.secrets["snowflake"]["user"],
-        password  = st.secrets["snowflake"]["password"],
-        warehouse = st.secrets["snowflake"]["warehouse"],
-        database  = st.secrets["snowflake"]["database"],
-        schema    = st.secrets["snowflake"]["schema"],
-    )
-
 # --- Query e cache ---------------------------------------------------------
-@st.cache_data(show_spinner=False)
-def load_cnaes_table():
-    conn = get_connection()
-    df = pd.read_sql(
-        "SELECT DISTINCT CODIGO as codigo, DESCRICAO as descricao FROM TB_CNAE_DESCR",
-        conn
-    )
-    conn.close()
-    return df
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _load_cnaes_index(version):
+    # lido do snapshot local (dados/snapshot.py); tabela e índice montados uma vez por versão
+    df = load_table("TB_CNAE_DESCR")
+    df = df[["CODIGO", "DESCRICAO"]].drop_duplicates().reset_index(drop=True)
+    return df, CodeTextIndex(df["CODIGO"], df["DESCRICAO"])
+
+def load_cnaes_index():
+    return _load_cnaes_index(current_version())
+
+def reset_page():
+    # nova busca volta para a primeira página
+    st.session_state.page_cnae = 1
 
 # --- App principal ---------------------------------------------------------
 def main():
     st.title("Consulta de Códigos CNAE - Tabela Completa")
 
-    # campo de busca
-    df_cnaes = load_cnaes_table()
+    # campo de busca (sem acento e sem diferenciar maiúsculas)
+    df_cnaes, index = load_cnaes_index()
     termo = st.text_input(
         "Pesquisar por código ou descrição:",
-        placeholder="Digite parte do código ou da descrição"
+        placeholder="Digite parte do código ou da descrição",
+        key="termo_cnae",
+        on_change=reset_page
     )
-    if termo:
-        mask_code = df_cnaes["CODIGO"].astype(str).str.contains(termo, case=False)
-        mask_desc = df_cnaes["DESCRICAO"].str.contains(termo, case=False)
-        df_filt = df_cnaes[mask_code | mask_desc]
-    else:
-        df_filt = df_cnaes
+    rows = index.search(termo) if termo else range(len(df_cnaes))
 
-    # paginação por blocos de 30 linhas
-    page_size = 30
-    list_df = [df_filt[i : i + page_size] for i in range(0, len(df_filt), page_size)]
-    if not list_df:
+    if not len(rows):
         st.warning("Nenhum registro encontrado.")
         return
 
-    st.dataframe(df_filt, use_container_width=True)
+    # paginação por blocos de 30 linhas: só a página atual é enviada ao navegador
+    page_size = 30
+    total_pages = math.ceil(len(rows) / page_size)
+    page = 1
+    if total_pages > 1:
+        page = st.selectbox(
+            "Página",
+            options=list(range(1, total_pages + 1)),
+            format_func=lambda x: f"{x} de {total_pages}",
+            key="page_cnae"
+        )
+    start = (page - 1) * page_size
+    page_rows = list(rows[start : start + page_size])
+
+    st.caption(f"{len(rows)} registros encontrados")
+    st.dataframe(df_cnaes.iloc[page_rows], use_container_width=True, hide_index=True)
 
 
 main()
@@ -1,10 +1,14 @@
 import streamlit as st
 import pandas as pd
-import snowflake.connector
-import math
-from io import BytesIO
 from st_aggrid import AgGrid, GridOptionsBuilder
 
+from dados.consultas import ORDERS, Filtros, fetch_empresa, open_search
+from dados.execucao import Job, render_job, show_job_outcome
+from dados.exportacao import render_export
+from dados.metricas import timed
+from dados.cnae import get_cnae_tree
+from dados.opcoes import get_municipio_options, get_uf_options
+
 
 st.set_page_config(page_title="CNAE/Cidades - Sistema Web Empresa", page_icon="logo_fgv.png", layout='wide')
 
@@ -17,72 +21,6 @@ span[data-baseweb="tag"] {
 </style>
 """, unsafe_allow_html=True)
 
-def get_connection():
-    return snowflake.connector.connect(
-        account   = st.secrets["snowflake"]["account"],
-        user      = st.secrets["snowflake"]["user"],
-        password  = st.secrets["snowflake"]["password"],
-        warehouse = st.secrets["snowflake"]["warehouse"],
-        database  = st.secrets["snowflake"]["database"],
-        schema    = st.secrets["snowflake"]["schema"],
-    )
-
-@st.cache_data(show_spinner=False)
-def get_cnae_options():
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("SELECT DISTINCT CODIGO_DESCR FROM TB_CNAE_DESCR ORDER BY CODIGO_DESCR")
-    opts = [r[0] for r in cur.fetchall()]
-    cur.close(); conn.close()
-    return opts
-
-@st.cache_data(show_spinner=False)
-def get_uf_options():
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("SELECT DISTINCT UF FROM TB_UF_MUNICIPIO ORDER BY UF")
-    opts = [r[0] for r in cur.fetchall()]
-    cur.close(); conn.close()
-    return opts
-
-@st.cache_data(show_spinner=False)
-def get_municipio_options(selected_ufs):
-    conn    = get_connection()
-    ufs_str = ",".join(f"'{u}'" for u in selected_ufs)
-    cur     = conn.cursor()
-    cur.execute(f"""
-        SELECT DISTINCT MUNICIPIO
-        FROM TB_UF_MUNICIPIO
-        WHERE UF IN ({ufs_str})
-        ORDER BY MUNICIPIO
-    """)
-    opts = [r[0] for r in cur.fetchall()]
-    cur.close(); conn.close()
-    return opts
-
-def execute_search_query(selected_cnaes, selected_ufs, selected_municipios):
-    conn = get_connection()
-    cur  = conn.cursor()
-
-    clauses = []
-    if selected_cnaes:
-        cnae_str = ",".join(f"'{c}'" for c in selected_cnaes)
-        clauses.append(f"CNAE_DESCR IN ({cnae_str})")
-    if selected_ufs:
-        uf_str = ",".join(f"'{u}'" for u in selected_ufs)
-        clauses.append(f"UF IN ({uf_str})")
-    if selected_municipios:
-        mun_str = ",".join(f"'{m}'" for m in selected_municipios)
-        clauses.append(f"MUNICIPIO IN ({mun_str})")
-
-    sql = "SELECT * FROM TB_MVP_CONS"
-    if clauses:
-        sql += " WHERE " + " AND ".join(clauses)
-
-    cur.execute(sql)
-    data = cur.fetchall()
-    cols = [d[0] for d in cur.description]
-    cur.close(); conn.close()
-    return pd.DataFrame(data, columns=cols)
-
 labels = {
                 "CNPJ": "CNPJ",
                 "NOME_FANTASIA": "Nome Fantasia",
@@ -117,8 +55,9 @@ def formatar_texto(row: pd.Series) -> str:
     return "\n\n".join(linhas)
 
 # estado inicial
-if "df_result_city" not in st.session_state:
-    st.session_state.df_result_city = None
+if "search_city" not in st.session_state:
+    st.session_state.search_city = None
+    st.session_state.job_city = None
 if "current_page_city" not in st.session_state:
     st.session_state.current_page_city = 1
 
@@ -126,12 +65,14 @@ with st.container(border=True):
     st.title("Filtros: CNAE/UF/Município")
 
     # 1) Sempre exibe Atividade Econômica
-    cnae_opts = get_cnae_options()
+    cnae_tree = get_cnae_tree()
     selected_cnaes = st.multiselect(
         "Atividade Econômica:",
-        options=cnae_opts,
+        options=cnae_tree.options,
+        format_func=cnae_tree.label,
         default=[],
-        key="cnae_select_city"
+        key="cnae_select_city",
+        help="Seção, divisão, grupo, classe ou subclasse da CNAE (busque pelo código ou pelo nome)"
     )
 
     col1, col2 = st.columns(2)
@@ -157,90 +98,102 @@ with st.container(border=True):
     )
 
     # 4) Botão SEM trava: sempre ativo
-    if st.button("Pesquisar", key="search_city"):
-        st.session_state.df_result_city = execute_search_query(
-            selected_cnaes, selected_ufs, selected_municipios
+    if st.button("Pesquisar", key="search_city_btn"):
+        if st.session_state.job_city is not None:
+            st.session_state.job_city.cancel()
+        st.session_state.job_city = Job(
+            "Pesquisa CNAE/UF/Município",
+            open_search,
+            Filtros.of(selected_cnaes, selected_ufs, selected_municipios),
         )
-        st.session_state.current_page_city = 1
+        st.session_state.search_city = None
+
 
+# pesquisa em segundo plano: acompanha até terminar; `done` é lido uma vez
+# só, para que a thread terminar no meio deste run não pule os dois ramos
+job = st.session_state.job_city
+done = job is not None and job.done
+if done:
+    st.session_state.job_city = None
+    if job.state == "done":
+        st.session_state.search_city = job.result
+        st.session_state.current_page_city = 1
+    else:
+        show_job_outcome(job)
 
-df_city = st.session_state.df_result_city
+search = st.session_state.search_city
 
-if df_city is not None:
-    if df_city.empty:
+if job is not None and not done:
+    render_job(job, key="city")
+elif search is not None:
+    if search.total == 0:
         st.warning("Não há dados para exibir para os filtros selecionados")
     else:
-        output = BytesIO()
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df_city.to_excel(writer, index=False, sheet_name="Empresas")
-        writer.close()
-        output.seek(0)  # volta o cursor para o início do buffer
-
-        st.download_button(
-            label="📥 Baixar dados filtrados (Excel)",
-            data=output,
-            file_name=f"consulta-cnae-cidades.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            help="Exporta todos os registros que atendem aos filtros"
+        if search.truncated:
+            st.warning(
+                f"A pesquisa retornaria cerca de {search.estimate:,} empresas; a grade mostra só as "
+                f"primeiras {search.total:,}. Baixe o arquivo para ter o resultado completo ou refine os filtros."
+                .replace(",", ".")
+            )
+        render_export(
+            key="city",
+            signature=("empresas", search.filtros),
+            batches_fn=search.batches,
+            file_name="consulta-cnae-cidades",
         )
-        df_city["orig_index"] = df_city.index
-
-        cols_visíveis = [
-            "CNPJ", "NOME_FANTASIA", "MATRIZ_FILIAL", "PORTE", 
-            "CAPITAL", "CNAE_FISCAL", "CNAE_DESCR", "orig_index"
-        ]
-
-        # 3) Cria um DataFrame apenas com as colunas visíveis:
-        disp = df_city[cols_visíveis].copy()
 
-        page_size     = 50
-        total_records = len(df_city)
-        total_pages   = math.ceil(total_records / page_size)
+        page_size     = search.page_size
+        total_records = search.total
+        total_pages   = search.total_pages
 
         with st.container(border=True):
-            # Seletor de página
-            st.session_state.current_page_city = st.selectbox(
+            # Seletor de página e ordenação (outras ordens além de CNPJ só
+            # sobre o resultado guardado no Snowflake, via RESULT_SCAN)
+            c_page, c_order = st.columns([3, 1])
+            st.session_state.current_page_city = c_page.selectbox(
                 "Página",
                 options=list(range(1, total_pages + 1)),
                 index=st.session_state.current_page_city - 1,
                 format_func=lambda x: f"{x} de {total_pages}",
                 key="page_df"
             )
+            order = c_order.selectbox("Ordenar por", options=list(ORDERS), key="order_city") if search.sortable else "CNPJ"
+
+            # Busca no banco só a página selecionada; ela já vem só com as
+            # colunas da grade, em tipos compactos (quem a guarda é o cache
+            # de resultados, não a sessão)
+            df_city = search.page(st.session_state.current_page_city, order)
 
             # Intervalo de linhas
             start_idx = (st.session_state.current_page_city - 1) * page_size
             end_idx   = min(start_idx + page_size, total_records)
 
-            # PAGINA disp, não df_city
-            page_df = disp.iloc[start_idx:end_idx]
-
             # Indicação de registros
             st.write(f"Exibindo registros {start_idx+1}–{end_idx} de {total_records}")
 
             # Configurações do AgGrid
-            gb = GridOptionsBuilder.from_dataframe(page_df)
+            gb = GridOptionsBuilder.from_dataframe(df_city)
             gb.configure_selection("single", use_checkbox=False)
-            # Oculta coluna orig_index na tela, mas ela deve existir no DataFrame
-            gb.configure_column("orig_index", hide=True)  
             grid_opts = gb.build()
 
-            grid_resp = AgGrid(
-                page_df,
-                gridOptions=grid_opts,
-                enable_enterprise_modules=False,
-                theme="streamlit",
-                height=600,
-                fit_columns_on_grid_load=True,
-            )
+            with timed("grid", rows=len(df_city)):
+                # cópia rasa: o AgGrid acrescenta uma coluna de id ao
+                # DataFrame recebido, e este é o objeto compartilhado do cache
+                grid_resp = AgGrid(
+                    df_city.copy(deep=False),
+                    gridOptions=grid_opts,
+                    enable_enterprise_modules=False,
+                    theme="streamlit",
+                    height=600,
+                    fit_columns_on_grid_load=True,
+                )
 
             sel = grid_resp["selected_rows"]
             full_row = None
             if isinstance(sel, list) and sel:
-                idx = sel[0]["orig_index"]
-                full_row = df_city.loc[idx]
+                full_row = fetch_empresa(sel[0]["CNPJ"])
             elif isinstance(sel, pd.DataFrame) and not sel.empty:
-                idx = sel.iloc[0]["orig_index"]
-                full_row = df_city.loc[idx]
+                full_row = fetch_empresa(sel.iloc[0]["CNPJ"])
 
             if full_row is not None:
                 @st.dialog("Detalhes da empresa")
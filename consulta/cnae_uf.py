@@ -1,10 +1,14 @@
 import streamlit as st
 import pandas as pd
-import snowflake.connector
-from io import BytesIO
-import math
 from st_aggrid import AgGrid, GridOptionsBuilder
 
+from dados.consultas import ORDERS, Filtros, fetch_empresa, open_search
+from dados.execucao import Job, render_job, show_job_outcome
+from dados.exportacao import render_export
+from dados.metricas import timed
+from dados.cnae import get_cnae_tree
+from dados.opcoes import get_uf_options
+
 st.set_page_config(page_title="CNAE/UF - Sistema Web Empresa", page_icon="logo_fgv.png",layout='wide')
 
 st.markdown("""
@@ -16,48 +20,6 @@ span[data-baseweb="tag"] {
 </style>
 """, unsafe_allow_html=True)
 
-def get_connection():
-    return snowflake.connector.connect(
-        account   = st.secrets["snowflake"]["account"],
-        user      = st.secrets["snowflake"]["user"],
-        password  = st.secrets["snowflake"]["password"],
-        warehouse = st.secrets["snowflake"]["warehouse"],
-        database  = st.secrets["snowflake"]["database"],
-        schema    = st.secrets["snowflake"]["schema"],
-    )
-
-@st.cache_data(show_spinner=False)
-def get_cnae_options():
-    conn = get_connection()
-    cur  = conn.cursor()
-    cur.execute("SELECT DISTINCT CODIGO_DESCR FROM TB_CNAE_DESCR ORDER BY CODIGO_DESCR")
-    opts = [r[0] for r in cur.fetchall()]
-    cur.close(); conn.close()
-    return opts
-
-@st.cache_data(show_spinner=False)
-def get_uf_options():
-    conn = get_connection()
-    cur  = conn.cursor()
-    cur.execute("SELECT DISTINCT UF FROM TB_UF_MUNICIPIO ORDER BY UF")
-    opts = [r[0] for r in cur.fetchall()]
-    cur.close(); conn.close()
-    return opts
-
-def execute_search_query(selected_cnaes, selected_ufs):
-    conn = get_connection()
-    cnae_str = ",".join(f"'{c}'" for c in selected_cnaes)
-    uf_str   = ",".join(f"'{u}'" for u in selected_ufs)
-    sql = f"""
-        SELECT *
-        FROM TB_MVP_CONS
-        WHERE UF IN ({uf_str})
-          AND CNAE_DESCR IN ({cnae_str})
-    """
-    df = pd.read_sql(sql, conn)
-    conn.close()
-    return df
-
 # labels e função formatar_texto (mantidos iguais)
 labels = {
     "CNPJ": "CNPJ",
@@ -92,92 +54,117 @@ def formatar_texto(row: pd.Series) -> str:
             linhas.append(f"**{rotulo}:** {valor}")
     return "\n\n".join(linhas)
 
-# --- filtros e armazenamento em session_state.df_result_uf (igual) ---
+# --- filtros e pesquisa em session_state.search_uf ---
 
-if "df_result_uf" not in st.session_state:
-    st.session_state.df_result_uf = None
+if "search_uf" not in st.session_state:
+    st.session_state.search_uf = None
+    st.session_state.job_uf = None
 
 with st.container(border=True):
     st.title("Filtros: CNAE/UF")
-    cnae_opts    = get_cnae_options()
+    cnae_tree    = get_cnae_tree()
     uf_opts      = get_uf_options()
     c1, c2       = st.columns(2)
-    sel_cnaes    = c1.multiselect("Atividade Econômica:", options=cnae_opts, key="cnae_select_uf")
+    sel_cnaes    = c1.multiselect("Atividade Econômica:", options=cnae_tree.options, format_func=cnae_tree.label,
+                                  key="cnae_select_uf",
+                                  help="Seção, divisão, grupo, classe ou subclasse da CNAE (busque pelo código ou pelo nome)")
     sel_ufs      = c2.multiselect("UF:", options=uf_opts, key="uf_select_uf")
-    if st.button("Pesquisar", key="search_uf"):
-        st.session_state.df_result_uf = execute_search_query(sel_cnaes, sel_ufs)
+    if st.button("Pesquisar", key="search_uf_btn"):
+        if not sel_cnaes or not sel_ufs:
+            st.warning("Selecione ao menos uma atividade econômica e uma UF.")
+        else:
+            if st.session_state.job_uf is not None:
+                st.session_state.job_uf.cancel()
+            st.session_state.job_uf = Job("Pesquisa CNAE/UF", open_search, Filtros.of(sel_cnaes, sel_ufs))
+            st.session_state.search_uf = None
+
+# pesquisa em segundo plano: acompanha até terminar; `done` é lido uma vez
+# só, para que a thread terminar no meio deste run não pule os dois ramos
+job = st.session_state.job_uf
+done = job is not None and job.done
+if done:
+    st.session_state.job_uf = None
+    if job.state == "done":
+        st.session_state.search_uf = job.result
+        st.session_state.page_uf = 1
+    else:
+        show_job_outcome(job)
 
-df_uf = st.session_state.df_result_uf
+search = st.session_state.search_uf
 
+if job is not None and not done:
+    render_job(job, key="uf")
 # se não veio nada
-if df_uf is None:
+elif search is None:
     st.info("Use os filtros acima e clique em Pesquisar.")
-elif df_uf.empty:
+elif search.total == 0:
     st.warning("Não há dados para exibir para os filtros selecionados")
 else:
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df_uf.to_excel(writer, index=False, sheet_name="Empresas")
-        writer.close()
-    output.seek(0)  # volta o cursor para o início do buffer
-
-    st.download_button(
-        label="📥 Baixar dados filtrados (Excel)",
-        data=output,
-        file_name=f"consulta-cnae-uf.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        help="Exporta todos os registros que atendem aos filtros"
+    if search.truncated:
+        st.warning(
+            f"A pesquisa retornaria cerca de {search.estimate:,} empresas; a grade mostra só as "
+            f"primeiras {search.total:,}. Baixe o arquivo para ter o resultado completo ou refine os filtros."
+            .replace(",", ".")
+        )
+    render_export(
+        key="uf",
+        signature=("empresas", search.filtros),
+        batches_fn=search.batches,
+        file_name="consulta-cnae-uf",
     )
-    # 1) prepara o DataFrame que será exibido (só 4 colunas + índice original)
-    cols_visíveis = ["CNPJ", "NOME_FANTASIA", "MATRIZ_FILIAL", "PORTE", "CAPITAL","CNAE_FISCAL", "CNAE_DESCR"]
-    disp = df_uf[cols_visíveis].copy()
-    disp["orig_index"] = disp.index  # mantém referência para a linha completa
-    
-    page_size     = 50
-    total_records = len(disp)
-    total_pages   = math.ceil(total_records / page_size)
+
+    total_records = search.total
+    total_pages   = search.total_pages
+    page_size     = search.page_size
 
     if "page_uf" not in st.session_state:
         st.session_state.page_uf = 1
     
-    page = st.selectbox(
+    c_page, c_order = st.columns([3, 1])
+    page = c_page.selectbox(
         "Página",
         options=list(range(1, total_pages + 1)),
         index=st.session_state.page_uf - 1,
         format_func=lambda x: f"{x} de {total_pages}",
         key="page_uf"
     )
+    # outras ordens só sobre o resultado guardado no Snowflake (RESULT_SCAN)
+    order = c_order.selectbox("Ordenar por", options=list(ORDERS), key="order_uf") if search.sortable else "CNPJ"
+
+    # 1) busca só a página pedida; ela já vem só com as colunas da grade
+    #    (GRID_COLUMNS), em tipos compactos; quem a guarda é o cache de
+    #    resultados, não a sessão
+    df_uf = search.page(page, order)
 
     start_idx = (page - 1) * page_size
     end_idx   = min(start_idx + page_size, total_records)
-    page_disp = disp.iloc[start_idx:end_idx]
 
     st.write(f"Exibindo registros {start_idx+1}–{end_idx} de {total_records}")
 
     # 3) configura AgGrid sobre esta página
-    gb = GridOptionsBuilder.from_dataframe(page_disp)
+    gb = GridOptionsBuilder.from_dataframe(df_uf)
     gb.configure_selection("single", use_checkbox=False)
-    gb.configure_column("orig_index", hide=True)
     grid_opts = gb.build()
 
-    grid_resp = AgGrid(
-        page_disp,
-        gridOptions=grid_opts,
-        enable_enterprise_modules=False,
-        theme="streamlit",
-        height=600,
-        fit_columns_on_grid_load=True,
-    )
-
-    # 4) captura seleção e busca a linha completa em df_uf
+    with timed("grid", rows=len(df_uf)):
+        # cópia rasa: o AgGrid acrescenta uma coluna de id ao DataFrame
+        # recebido, e este é o objeto compartilhado do cache
+        grid_resp = AgGrid(
+            df_uf.copy(deep=False),
+            gridOptions=grid_opts,
+            enable_enterprise_modules=False,
+            theme="streamlit",
+            height=600,
+            fit_columns_on_grid_load=True,
+        )
+
+    # 4) captura seleção e busca o registro completo pelo CNPJ
     sel = grid_resp["selected_rows"]
     full_row = None
     if isinstance(sel, list) and sel:
-        idx = sel[0]["orig_index"]
-        full_row = df_uf.loc[idx]
+        full_row = fetch_empresa(sel[0]["CNPJ"])
     elif isinstance(sel, pd.DataFrame) and not sel.empty:
-        idx = sel.iloc[0]["orig_index"]
-        full_row = df_uf.loc[idx]
+        full_row = fetch_empresa(sel.iloc[0]["CNPJ"])
 
     # 5) abre o modal com todos os campos
     if full_row is not None:
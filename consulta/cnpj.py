@@ -1,34 +1,37 @@
 import streamlit as st
 import pandas as pd
-import snowflake.connector
+import pyarrow as pa
 import math
-from io import BytesIO
+import hashlib
 from st_aggrid import AgGrid, GridOptionsBuilder
 
+from dados.cache import data_version, result_cached
+from dados.cnpj import get_negative_cache, is_valid_cnpj, lookup_batches, normalize_cnpj, read_cnpj_upload
+from dados.exportacao import render_export
+from dados.memoria import get_frame, put_frame
+from dados.leitura import read_frame
+from dados.metricas import timed
+
 st.set_page_config(page_title="CNPJ - Sistema Web Empresa", page_icon="logo_fgv.png", layout='wide')
 
-def get_connection():
-    return snowflake.connector.connect(
-        account   = st.secrets["snowflake"]["account"],
-        user      = st.secrets["snowflake"]["user"],
-        password  = st.secrets["snowflake"]["password"],
-        warehouse = st.secrets["snowflake"]["warehouse"],
-        database  = st.secrets["snowflake"]["database"],
-        schema    = st.secrets["snowflake"]["schema"],
-    )
+@result_cached("cnpj")
+def fetch_cnpj(cnpj):
+    query  = "SELECT * FROM TB_MVP_CONS WHERE CNPJ = ?"
+    return read_frame(query, [cnpj], compact=True)
 
 def execute_search_query_cnpj(cnpj):
-    # Remove pontos, barras e traços
-    cnpj = cnpj.translate(str.maketrans("", "", "./-"))
-    conn   = get_connection()
-    query  = f"SELECT * FROM TB_MVP_CONS WHERE CNPJ = '{cnpj}'"
-    cur    = conn.cursor()
-    cur.execute(query)
-    data   = cur.fetchall()
-    cols   = [d[0] for d in cur.description]
-    cur.close()
-    conn.close()
-    return pd.DataFrame(data, columns=cols)
+    """
+    Consulta um CNPJ já validado. CNPJs que voltaram vazios recentemente
+    ficam no cache negativo e não vão de novo ao banco.
+    """
+    missing = get_negative_cache()
+    key = (data_version(), cnpj)
+    if key in missing:
+        return pd.DataFrame()
+    df = fetch_cnpj(cnpj)
+    if df.empty:
+        missing.add(key)
+    return df
 
 def mod_cons_cnpj_ui():
     with st.container(border=True):
@@ -76,62 +79,60 @@ def formatar_texto(row: pd.Series) -> str:
     # separa com duas quebras de linha para melhor leitura no Markdown
     return "\n\n".join(linhas)
 
+# colunas exibidas na grade
+CNPJ_GRID_COLUMNS = [
+    "CNPJ",
+    "NOME_FANTASIA",
+    "MATRIZ_FILIAL",
+    "PORTE",
+    "CAPITAL",
+    "CNAE_FISCAL",
+    "CNAE_DESCR",
+]
+
 def safe(val):
     return val if pd.notna(val) and str(val).strip() else "--"
 
 def mod_cons_cnpj_server(input_cnpj, pesquisar):
-    # 1) Se o usuário clicou em "Pesquisar", executa a query e guarda em session_state
+    # 1) Se o usuário clicou em "Pesquisar", executa a query e guarda o resultado
+    #    da sessão em dados.memoria (que pode despejá-lo em disco e relê-lo depois)
     if pesquisar:
-        if not input_cnpj.strip():
+        # Remove pontos, barras e traços e confere os dígitos verificadores
+        cnpj = normalize_cnpj(input_cnpj)
+        if not is_valid_cnpj(cnpj):
             st.error("Por favor, insira um CNPJ válido.")
             return
         with st.spinner("Executando a query..."):
-            df_result = execute_search_query_cnpj(input_cnpj.strip())
-        # Guarda em session_state para persistir entre reruns
-        st.session_state.df_cnpj = df_result
+            df_result = execute_search_query_cnpj(cnpj)
+        # Guarda para persistir entre reruns, junto com o DataFrame exibido
+        # (colunas visíveis + orig_index), montado só aqui
+        put_frame("df_cnpj", df_result)
+        if not df_result.empty:
+            put_frame("disp_cnpj", df_result[CNPJ_GRID_COLUMNS].assign(orig_index=df_result.index))
 
-    # 2) Se já existia um resultado salvo em session_state, reusa-o para exibir a grade
-    if "df_cnpj" not in st.session_state:
+    # 2) Se já existia um resultado salvo, reusa-o para exibir a grade
+    df_result = get_frame("df_cnpj")
+    if df_result is None:
         return  # nada a fazer até que o usuário pesquise ao menos uma vez
 
-    df_result = st.session_state.df_cnpj
-
     # 3) Se estiver vazio, mostra aviso e retorna
     if df_result.empty:
         st.warning("Não há dados para o CNPJ informado.")
         return
     
-    buffer = BytesIO()
-    with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-        df_result.to_excel(writer, sheet_name="Resultado", index=False)
-        writer.close()
-    buffer.seek(0)
-
-    st.download_button(
-        label="📥 Baixar resultado (Excel)",
-        data=buffer,
-        file_name=f"consulta_cnpj_{input_cnpj.strip()}.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        key="dl_xlsx_cnpj"
+    render_export(
+        key="xlsx_cnpj",
+        signature=("cnpj", tuple(df_result["CNPJ"])),
+        batches_fn=lambda: pa.Table.from_pandas(df_result, preserve_index=False).to_batches(),
+        file_name=f"consulta_cnpj_{df_result['CNPJ'].iloc[0]}",  # o CNPJ exibido, não o campo
+        sheet_name="Resultado",
+        label="📥 Baixar resultado",
+        help=None,
     )
-    # 4) Garante que existe a coluna orig_index
-    if "orig_index" not in df_result.columns:
-        df_result["orig_index"] = df_result.index
-
-    # 5) Monta o DataFrame 'disp' apenas com as colunas que vamos exibir + orig_index
-    cols_visiveis = [
-        "CNPJ",
-        "NOME_FANTASIA",
-        "MATRIZ_FILIAL",
-        "PORTE",
-        "CAPITAL",
-        "CNAE_FISCAL",
-        "CNAE_DESCR",
-        "orig_index"
-    ]
-    disp = df_result[cols_visiveis].copy()
-
-    # 6) Paginação
+    # 4) DataFrame exibido, já montado na pesquisa
+    disp = get_frame("disp_cnpj")
+
+    # 5) Paginação
     page_size     = 50
     total_records = len(disp)
     total_pages   = math.ceil(total_records / page_size)
@@ -155,22 +156,23 @@ def mod_cons_cnpj_server(input_cnpj, pesquisar):
 
         st.write(f"Exibindo registros {start_idx + 1}–{end_idx} de {total_records}")
 
-        # 7) Configura o AgGrid
+        # 6) Configura o AgGrid
         gb = GridOptionsBuilder.from_dataframe(page_df)
         gb.configure_selection("single", use_checkbox=False)
         gb.configure_column("orig_index", hide=True)  # oculta, mas mantém disponível
         grid_opts = gb.build()
 
-        grid_resp = AgGrid(
-            page_df,
-            gridOptions=grid_opts,
-            enable_enterprise_modules=False,
-            theme="streamlit",
-            height=600,
-            fit_columns_on_grid_load=True,
-        )
+        with timed("grid", rows=len(page_df)):
+            grid_resp = AgGrid(
+                page_df,
+                gridOptions=grid_opts,
+                enable_enterprise_modules=False,
+                theme="streamlit",
+                height=600,
+                fit_columns_on_grid_load=True,
+            )
 
-        # 8) Verifica se há linha selecionada
+        # 7) Verifica se há linha selecionada
         sel = grid_resp["selected_rows"]
         selected_index = None
         if isinstance(sel, list) and sel:
@@ -178,7 +180,7 @@ def mod_cons_cnpj_server(input_cnpj, pesquisar):
         elif isinstance(sel, pd.DataFrame) and not sel.empty:
             selected_index = sel.iloc[0]["orig_index"]
 
-        # 9) Se houver seleção, guarda em session_state para manter entre reruns
+        # 8) Se houver seleção, guarda em session_state para manter entre reruns
         if selected_index is not None:
             st.session_state.selected_index_cnpj = selected_index
         else:
@@ -186,7 +188,7 @@ def mod_cons_cnpj_server(input_cnpj, pesquisar):
             if "selected_index_cnpj" in st.session_state:
                 st.session_state.pop("selected_index_cnpj")
 
-    # 10) Depois de tudo, se ainda estiver setado selected_index_cnpj, exibe o diálogo
+    # 9) Depois de tudo, se ainda estiver setado selected_index_cnpj, exibe o diálogo
     if "selected_index_cnpj" in st.session_state:
         idx = st.session_state.selected_index_cnpj
         full_row = df_result.loc[idx]
@@ -199,6 +201,63 @@ def mod_cons_cnpj_server(input_cnpj, pesquisar):
         show_details()
 
 
+def mod_cons_lote():
+    with st.container(border=True):
+        st.title("Consulta em lote")
+        uploaded = st.file_uploader(
+            "Arquivo com CNPJs (CSV ou XLSX):",
+            type=["csv", "xlsx"],
+            key="upload_cnpj",
+            help="Usa a coluna CNPJ, ou a primeira coluna do arquivo. Aceita CNPJs com ou sem pontuação."
+        )
+    if uploaded is None:
+        return
+
+    # lê o arquivo uma vez por upload; a lista (que pode ter milhões de CNPJs)
+    # fica em dados.memoria junto com os demais resultados da sessão
+    lote = get_frame("lote_cnpj")
+    if lote is None or st.session_state.get("lote_cnpj_file") != uploaded.file_id:
+        cnpjs, invalidos = read_cnpj_upload(uploaded)
+        lote = pd.DataFrame({"CNPJ": cnpjs + invalidos, "VALIDO": pd.array([True] * len(cnpjs) + [False] * len(invalidos), dtype=bool)})
+        put_frame("lote_cnpj", lote)
+        st.session_state.lote_cnpj_file = uploaded.file_id
+    cnpjs     = lote.loc[lote["VALIDO"], "CNPJ"].tolist()
+    invalidos = lote.loc[~lote["VALIDO"], "CNPJ"].tolist()
+
+    if invalidos:
+        st.warning(
+            f"{len(invalidos):,} CNPJs inválidos (tamanho ou dígito verificador) serão ignorados. "
+            f"Ex.: {', '.join(invalidos[:5])}"
+        )
+    if not cnpjs:
+        st.warning("Nenhum CNPJ válido encontrado no arquivo.")
+        return
+    st.write(f"{len(cnpjs):,} CNPJs distintos no arquivo.")
+
+    # os resultados vão do banco direto para o arquivo exportado
+    progress = st.empty()
+    def batches():
+        bar = progress.progress(0.0, text="Consultando...")
+        def on_progress(done, total):
+            bar.progress(done / total, text=f"Blocos consultados: {done} de {total}")
+        yield from lookup_batches(cnpjs, on_progress)
+
+    digest = hashlib.sha1("\n".join(sorted(cnpjs)).encode()).hexdigest()
+    render_export(
+        key="lote_cnpj",
+        signature=("cnpj-lote", digest),
+        batches_fn=batches,
+        file_name="consulta_cnpj_lote",
+        sheet_name="Resultado",
+        label="📥 Baixar resultado",
+        help=None,
+    )
+
+
 # === Chamadas principais ===
-input_cnpj, pesquisar = mod_cons_cnpj_ui()
-mod_cons_cnpj_server(input_cnpj, pesquisar)
+tab_cnpj, tab_lote = st.tabs(["CNPJ", "Em lote"])
+with tab_cnpj:
+    input_cnpj, pesquisar = mod_cons_cnpj_ui()
+    mod_cons_cnpj_server(input_cnpj, pesquisar)
+with tab_lote:
+    mod_cons_lote()
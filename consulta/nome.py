@@ -0,0 +1,118 @@
+import streamlit as st
+import pandas as pd
+from st_aggrid import AgGrid, GridOptionsBuilder
+
+from dados.busca_nome import get_name_index
+from dados.consultas import fetch_empresa
+from dados.memoria import get_frame, put_frame
+from dados.metricas import timed
+from dados.opcoes import get_cnae_options, get_uf_options
+
+st.set_page_config(page_title="Nome - Sistema Web Empresa", page_icon="logo_fgv.png",layout='wide')
+
+st.markdown("""
+<style>
+span[data-baseweb="tag"] {
+  color: white;
+  background-color: #0E59E6;
+}
+</style>
+""", unsafe_allow_html=True)
+
+labels = {
+    "CNPJ": "CNPJ",
+    "NOME_FANTASIA": "Nome Fantasia",
+    "RAZAO_SOCIAL": "Razão Social",
+    "MATRIZ_FILIAL": "Matriz/Filial",
+    "PORTE": "Porte",
+    "CAPITAL": "Capital Social",
+    "SITUACAO": "Situação",
+    "CNAE_FISCAL": "CNAE Fiscal",
+    "CNAE_DESCR": "Descrição CNAE",
+    "CNAE_SECUNDARIO": "CNAE Secundário",
+    "LOGRADOURO": "Logradouro",
+    "NUMERO": "Número",
+    "COMPLEMENTO": "Complemento",
+    "BAIRRO": "Bairro",
+    "CEP": "CEP",
+    "UF": "UF",
+    "MUNICIPIO": "Município",
+    "DDD_1": "DDD 1",
+    "TELEFONE_1": "Telefone 1",
+    "DDD_2": "DDD 2",
+    "TELEFONE_2": "Telefone 2",
+    "EMAIL": "E-mail"
+}
+
+def formatar_texto(row: pd.Series) -> str:
+    linhas = []
+    for col, rotulo in labels.items():
+        valor = row.get(col, "")
+        if pd.notna(valor) and str(valor).strip():
+            linhas.append(f"**{rotulo}:** {valor}")
+    return "\n\n".join(linhas)
+
+# --- filtros e resultado em dados.memoria ("df_result_nome") ---
+
+index = get_name_index()
+
+with st.container(border=True):
+    st.title("Filtros: Nome")
+    if index is None:
+        st.warning("O índice de nomes ainda não foi gerado (python -m dados.busca_nome).")
+        st.stop()
+    termo        = st.text_input("Razão social ou nome fantasia:", key="termo_nome",
+                                 placeholder="Ex.: padaria pao de acucar")
+    c1, c2, c3   = st.columns([3, 2, 1])
+    sel_cnaes    = c1.multiselect("Atividade Econômica (opcional):", options=get_cnae_options(), key="cnae_select_nome")
+    sel_ufs      = c2.multiselect("UF (opcional):", options=get_uf_options(), key="uf_select_nome")
+    top_k        = c3.number_input("Resultados:", min_value=10, max_value=500, value=50, step=10, key="top_k_nome")
+    if st.button("Pesquisar", key="search_nome_btn"):
+        if len(termo.strip()) < 3:
+            st.warning("Digite ao menos 3 caracteres do nome.")
+        else:
+            with timed("name_search") as event:
+                df_nome = index.search(termo, k=top_k, ufs=sel_ufs, cnaes=sel_cnaes)
+                event["rows"] = len(df_nome)
+            put_frame("df_result_nome", df_nome)
+    st.caption(f"Índice gerado em {index.meta['built_at']} ({index.meta['docs']:,} empresas).".replace(",", "."))
+
+df_nome = get_frame("df_result_nome")
+
+if df_nome is None:
+    st.info("Digite um nome e clique em Pesquisar.")
+elif df_nome.empty:
+    st.warning("Nenhuma empresa encontrada com esse nome.")
+else:
+    st.write(f"{len(df_nome)} empresas mais parecidas com a busca")
+
+    gb = GridOptionsBuilder.from_dataframe(df_nome)
+    gb.configure_selection("single", use_checkbox=False)
+    gb.configure_column("SCORE", header_name="Relevância")
+    grid_opts = gb.build()
+
+    with timed("grid", rows=len(df_nome)):
+        # cópia rasa: o AgGrid acrescenta uma coluna de id ao DataFrame
+        # recebido, e este é o guardado em SessionFrames
+        grid_resp = AgGrid(
+            df_nome.copy(deep=False),
+            gridOptions=grid_opts,
+            enable_enterprise_modules=False,
+            theme="streamlit",
+            height=600,
+            fit_columns_on_grid_load=True,
+        )
+
+    sel = grid_resp["selected_rows"]
+    full_row = None
+    if isinstance(sel, list) and sel:
+        full_row = fetch_empresa(sel[0]["CNPJ"])
+    elif isinstance(sel, pd.DataFrame) and not sel.empty:
+        full_row = fetch_empresa(sel.iloc[0]["CNPJ"])
+
+    if full_row is not None:
+        @st.dialog("Detalhes da empresa")
+        def show_details():
+            st.markdown("#### Dados completos:")
+            st.markdown(formatar_texto(full_row))
+        show_details()
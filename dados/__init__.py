@@ -0,0 +1,3 @@
+"""
+Camada de acesso a dados compartilhada pelas páginas do Sistema Web Empresas.
+"""
@@ -0,0 +1,149 @@
+import numpy as np
+import streamlit as st
+
+from dados.busca import fold_code
+from dados.cache import data_version
+from dados.cnae import merge_ranges, ranges_mask
+from dados.config import setting
+from dados.leitura import read_frame
+from dados.snapshot import current_version, load_table
+
+
+# --- Índices pré-calculados da Visão Geral ----------------------------------
+def _runs(*columns):
+    """
+    Para colunas já ordenadas, devolve {chave: (início, fim)} de cada
+    sequência de linhas com a mesma chave.
+    """
+    n = len(columns[0])
+    if n == 0:
+        return {}
+    change = np.zeros(n, dtype=bool)
+    change[0] = True
+    for col in columns:
+        values = col.to_numpy()
+        change[1:] |= values[1:] != values[:-1]
+    starts = np.flatnonzero(change)
+    ends = np.append(starts[1:], n)
+    keys = zip(*(col.to_numpy()[starts] for col in columns))
+    return {
+        (key if len(columns) > 1 else key[0]): (int(s), int(e))
+        for key, s, e in zip(keys, starts, ends)
+    }
+
+
+class OverviewIndex:
+    """
+    Estruturas de consulta da Visão Geral, montadas uma vez por carga.
+
+    Os agregados ficam ordenados uma única vez; cada seleção da tela vira
+    um acesso a dicionário que devolve uma fatia já pronta para exibir, sem
+    varrer TB_CNAE_UF / TB_CNAE_UF_MUNICIPIO a cada rerun.
+    """
+
+    def __init__(self, df1, df2, top_n=10):
+        df1 = df1.dropna()
+        top = (
+            df1.sort_values(["CNAE_DESCR", "COUNTER"], ascending=[True, False], kind="stable")
+            .rename(columns={"UF": "Estado", "COUNTER": "Nº Empresas Ativas"})
+            .reset_index(drop=True)
+        )
+        self._top = top
+        self._top_slices = {
+            cnae: (start, min(start + top_n, end))
+            for cnae, (start, end) in _runs(top["CNAE_DESCR"]).items()
+        }
+        self.cnae_list = list(self._top_slices)
+
+        df2 = df2.dropna(subset=["CNAE_DESCR", "UF"])
+        mun = (
+            df2.sort_values(["CNAE_DESCR", "UF", "COUNTER"], ascending=[True, True, False], kind="stable")
+            .rename(columns={"CNAE_DESCR": "Atividade Realizada", "MUNICIPIO": "Município", "COUNTER": "Nº Empresas Ativas"})
+            .reset_index(drop=True)
+        )
+        self._mun = mun[["Atividade Realizada", "Município", "Nº Empresas Ativas"]]
+        self._mun_slices = _runs(mun["Atividade Realizada"], mun["UF"])
+        self.uf_list = sorted(df2["UF"].unique())
+
+    def top_ufs(self, cnae):
+        """Os `top_n` estados com mais empresas no CNAE (Estado, Nº Empresas Ativas)."""
+        start, end = self._top_slices.get(cnae, (0, 0))
+        return self._top.iloc[start:end]
+
+    def municipios(self, cnae, uf):
+        """Municípios do par (CNAE, UF), do maior para o menor COUNTER."""
+        start, end = self._mun_slices.get((cnae, uf), (0, 0))
+        return self._mun.iloc[start:end]
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _build_overview_index(version):
+    return OverviewIndex(load_table("TB_CNAE_UF"), load_table("TB_CNAE_UF_MUNICIPIO"))
+
+
+def get_overview_index():
+    """Índice da versão atual dos dados (compartilhado, sem cópia por sessão)."""
+    return _build_overview_index(current_version())
+
+
+# --- Estimativa do tamanho de uma pesquisa ----------------------------------
+def _with_code(df):
+    """Acrescenta CNAE_CODIGO: o código do CNAE_DESCR ("4711302 - ...") como inteiro."""
+    codes = df["CNAE_DESCR"].fillna("").str.split(" - ", n=1).str[0].map(fold_code)
+    return df.assign(CNAE_CODIGO=np.where(codes.str.isdigit(), codes, "-1").astype(np.int64))
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _count_tables(version):
+    by_uf = load_table("TB_CNAE_UF")[["CNAE_DESCR", "UF", "COUNTER"]].dropna(subset=["COUNTER"])
+    by_mun = load_table("TB_CNAE_UF_MUNICIPIO")[["CNAE_DESCR", "UF", "MUNICIPIO", "COUNTER"]]
+    return _with_code(by_uf), _with_code(by_mun.dropna(subset=["COUNTER"]))
+
+
+def estimate_count(filtros):
+    """
+    Número aproximado de empresas que atendem aos filtros, somado nos
+    agregados TB_CNAE_UF / TB_CNAE_UF_MUNICIPIO do snapshot local.
+
+    Não toca no warehouse; serve para decidir, antes de consultar
+    TB_MVP_CONS, se o resultado cabe na exibição interativa.
+    """
+    by_uf, by_mun = _count_tables(current_version())
+    df = by_mun if filtros.municipios else by_uf
+    mask = np.ones(len(df), dtype=bool)
+    if filtros.cnaes:
+        mask &= ranges_mask(df["CNAE_CODIGO"].to_numpy(), merge_ranges(filtros.cnaes))
+    for column, values in (("UF", filtros.ufs), ("MUNICIPIO", filtros.municipios)):
+        if values:
+            mask &= df[column].isin(values).to_numpy()
+    return int(df["COUNTER"].to_numpy()[mask].sum())
+
+
+# --- Totais da Visão Geral ---------------------------------------------------
+OVERVIEW_COUNTS_SQL = """
+    SELECT
+        (SELECT COUNT(*) FROM TB_MVP_CONS)                      AS TOT_COUNT,
+        (SELECT COUNT(DISTINCT CODIGO_DESCR) FROM TB_CNAE_DESCR) AS SUBCLASSES,
+        (SELECT COUNT(DISTINCT UF) FROM TB_UF_MUNICIPIO)         AS ESTADOS,
+        (SELECT COUNT(DISTINCT MUNICIPIO) FROM TB_UF_MUNICIPIO)  AS MUNICIPIOS
+"""
+
+
+@st.cache_data(show_spinner=False, max_entries=2, ttl=setting("overview_counts_ttl", 24 * 3600))
+def _overview_counts(version):
+    row = read_frame(OVERVIEW_COUNTS_SQL).iloc[0]
+    return tuple(int(row[c]) for c in ("TOT_COUNT", "SUBCLASSES", "ESTADOS", "MUNICIPIOS"))
+
+
+def load_overview_counts():
+    """
+    Retorna os principais totais, numa única consulta:
+      - tot_count: total de empresas ativas
+      - subclasses: número de subclasses CNAE
+      - estados: número de estados + DF
+      - municipios: número de municípios
+
+    O cache é por versão dos dados, então os totais mudam junto com a carga;
+    o TTL é só uma rede de segurança.
+    """
+    return _overview_counts(data_version())
@@ -0,0 +1,35 @@
+import logging
+import threading
+
+import streamlit as st
+
+from dados.agregados import get_overview_index, load_overview_counts
+from dados.cnae import get_cnae_tree
+from dados.opcoes import get_cnae_options, get_uf_options
+
+
+logger = logging.getLogger(__name__)
+
+
+# --- Aquecimento dos caches --------------------------------------------------
+def warm_up():
+    """
+    Preenche os caches compartilhados que as páginas usam ao abrir: snapshot
+    local, totais e índices da Visão Geral, opções dos filtros e árvore CNAE.
+    """
+    for step in (load_overview_counts, get_overview_index, get_cnae_options, get_cnae_tree, get_uf_options):
+        try:
+            step()
+        except Exception:
+            logger.exception("Falha ao aquecer %s", step.__name__)
+
+
+@st.cache_resource(show_spinner=False)
+def start_warm_up():
+    """
+    Dispara warm_up() em segundo plano, uma vez por processo, para que o
+    primeiro visitante depois de um deploy não espere pelas consultas.
+    """
+    thread = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,100 @@
+import bisect
+import re
+import unicodedata
+
+
+# --- Normalização de texto ---------------------------------------------------
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def fold(text):
+    """
+    Forma de busca de um texto: sem acentos, minúsculo e só com letras e
+    dígitos separados por espaço ("Confecção de Roupas" -> "confeccao de roupas").
+    """
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    return _NON_ALNUM.sub(" ", text).strip()
+
+
+def fold_code(code, width=7):
+    """Só os dígitos do código, com os zeros à esquerda que um campo numérico perdeu."""
+    digits = re.sub(r"\D", "", str(code))
+    return digits.zfill(width) if digits and len(digits) <= width else digits
+
+
+# --- Índice de códigos e descrições -----------------------------------------
+class CodeTextIndex:
+    """
+    Índice de busca sobre pares (código, descrição), montado uma vez.
+
+    - descrições: cada palavra dobrada (fold) aponta para as linhas em que
+      aparece; as palavras ficam ordenadas para achar prefixos por bisect;
+    - códigos: guardados só com dígitos, buscados por prefixo e por trecho.
+
+    Uma consulta casa se todas as palavras digitadas forem prefixo de alguma
+    palavra da descrição, ou se os dígitos digitados aparecerem no código.
+    O resultado vem ordenado por relevância.
+    """
+
+    def __init__(self, codes, texts):
+        self.codes = [fold_code(c) for c in codes]
+        self.texts = [fold(t) for t in texts]
+        postings = {}
+        for row, text in enumerate(self.texts):
+            for token in set(text.split()):
+                postings.setdefault(token, set()).add(row)
+        self._tokens = sorted(postings)
+        self._postings = [postings[t] for t in self._tokens]
+
+    def _prefix_rows(self, prefix):
+        """Linhas com alguma palavra começando por `prefix` (e se alguma é exata)."""
+        start = bisect.bisect_left(self._tokens, prefix)
+        rows, exact = set(), set()
+        for i in range(start, len(self._tokens)):
+            token = self._tokens[i]
+            if not token.startswith(prefix):
+                break
+            rows |= self._postings[i]
+            if token == prefix:
+                exact = self._postings[i]
+        return rows, exact
+
+    def search(self, query):
+        """Posições das linhas que casam com `query`, da mais para a menos relevante."""
+        folded = fold(query)
+        if not folded:
+            return list(range(len(self.codes)))
+        scores = {}
+
+        digits = re.sub(r"\D", "", query)
+        if digits and re.fullmatch(r"[\d\s./-]+", query.strip()):
+            for row, code in enumerate(self.codes):
+                if code == digits:
+                    scores[row] = 300
+                elif code.startswith(digits):
+                    scores[row] = 200
+                elif digits in code:
+                    scores[row] = 100
+
+        tokens = folded.split()
+        matched = None
+        exact_hits = {}
+        for token in tokens:
+            rows, exact = self._prefix_rows(token)
+            matched = rows if matched is None else matched & rows
+            for row in exact:
+                exact_hits[row] = exact_hits.get(row, 0) + 1
+            if not matched:
+                break
+        for row in matched or ():
+            text = self.texts[row]
+            score = 50 + 10 * exact_hits.get(row, 0)
+            if text.startswith(folded):
+                score += 20
+            elif folded in text:
+                score += 10
+            scores[row] = max(scores.get(row, 0), score)
+
+        # mais relevantes primeiro; no empate, descrições mais curtas e depois o código
+        return sorted(scores, key=lambda r: (-scores[r], len(self.texts[r]), self.codes[r]))
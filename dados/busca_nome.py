@@ -0,0 +1,296 @@
+"""
+Busca de empresas por nome (RAZAO_SOCIAL / NOME_FANTASIA).
+
+O índice é montado fora do app, depois de cada carga, com:
+
+    python -m dados.busca_nome
+
+e fica em <snapshot_dir>/nomes/current:
+
+    docs.arrow        CNPJ, nomes, UF, município e CNAE (Arrow IPC, lido via mmap)
+    uf.npy, cnae.npy  códigos de UF / CNAE_DESCR por documento (facetas)
+    offsets.npy       início da lista de cada trigrama em postings.npy
+    postings.npy      ids dos documentos, agrupados por trigrama
+    meta.json         versão dos dados e rótulos das facetas
+
+Tudo é aberto com memory map: o processo só carrega as páginas do disco que
+uma consulta realmente toca.
+"""
+import json
+import logging
+import math
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import streamlit as st
+
+from dados.busca import fold
+from dados.cache import data_version
+from dados.config import setting
+from dados.exportacao import write_arrow
+from dados.leitura import iter_arrow
+from dados.snapshot import snapshot_dir
+
+
+logger = logging.getLogger(__name__)
+
+DOC_COLUMNS = ("CNPJ", "RAZAO_SOCIAL", "NOME_FANTASIA", "UF", "MUNICIPIO", "CNAE_DESCR")
+
+# --- Trigramas ---------------------------------------------------------------
+# fold() deixa só [a-z0-9 ]: 37 símbolos, logo 37**3 = 50.653 trigramas, que
+# cabem em um uint16.
+ALPHABET = " abcdefghijklmnopqrstuvwxyz0123456789"
+BASE = len(ALPHABET)
+N_TRIGRAMS = BASE ** 3
+_TRIGRAM_CODE = {
+    a + b + c: (i * BASE + j) * BASE + k
+    for i, a in enumerate(ALPHABET)
+    for j, b in enumerate(ALPHABET)
+    for k, c in enumerate(ALPHABET)
+}
+PAIR_DTYPE = np.dtype([("tri", "<u2"), ("doc", "<u4")])
+
+
+def trigrams(folded):
+    """Códigos dos trigramas distintos de um texto já dobrado (com bordas de palavra)."""
+    padded = f"  {folded} "
+    return {_TRIGRAM_CODE[padded[i:i + 3]] for i in range(len(padded) - 2)}
+
+
+def doc_text(razao, fantasia):
+    return fold(f"{razao or ''} {fantasia or ''}")
+
+
+# --- Construção do índice ----------------------------------------------------
+def _encode(values, labels, dtype):
+    """Converte rótulos em códigos inteiros, ampliando `labels` conforme aparecem."""
+    codes = np.empty(len(values), dtype=dtype)
+    for i, value in enumerate(values):
+        codes[i] = labels.setdefault(value, len(labels))
+    return codes
+
+
+def build_name_index(out_dir, batches, partitions=64):
+    """
+    Monta o índice em `out_dir` a partir dos lotes Arrow de DOC_COLUMNS.
+
+    Os pares (trigrama, documento) são espalhados em `partitions` arquivos
+    por faixa de trigrama e depois ordenados uma faixa por vez, então a
+    memória usada é ~1/partitions do total de pares, qualquer que seja o
+    número de empresas.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    write_arrow(out_dir / "docs.arrow", batches)
+
+    reader = pa.ipc.open_file(pa.memory_map(str(out_dir / "docs.arrow")))
+    n_docs = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+    uf = np.lib.format.open_memmap(out_dir / "uf.npy", mode="w+", dtype=np.uint8, shape=(n_docs,))
+    cnae = np.lib.format.open_memmap(out_dir / "cnae.npy", mode="w+", dtype=np.uint16, shape=(n_docs,))
+    uf_labels, cnae_labels = {}, {}
+
+    span = math.ceil(N_TRIGRAMS / partitions)
+    spill_dir = Path(tempfile.mkdtemp(prefix="swe-nomes-", dir=out_dir))
+    spill = [open(spill_dir / f"{p}.bin", "wb") for p in range(partitions)]
+    try:
+        doc = 0
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            cols = {name: batch.column(name).to_pylist() for name in DOC_COLUMNS}
+            n = batch.num_rows
+            uf[doc:doc + n] = _encode(cols["UF"], uf_labels, np.uint8)
+            cnae[doc:doc + n] = _encode(cols["CNAE_DESCR"], cnae_labels, np.uint16)
+
+            tris, docs = [], []
+            for offset, (razao, fantasia) in enumerate(zip(cols["RAZAO_SOCIAL"], cols["NOME_FANTASIA"])):
+                codes = trigrams(doc_text(razao, fantasia))
+                tris.extend(codes)
+                docs.extend([doc + offset] * len(codes))
+            pairs = np.empty(len(tris), dtype=PAIR_DTYPE)
+            pairs["tri"] = tris
+            pairs["doc"] = docs
+            part = pairs["tri"] // span
+            order = np.argsort(part, kind="stable")
+            pairs, part = pairs[order], part[order]
+            bounds = np.searchsorted(part, np.arange(partitions + 1))
+            for p in range(partitions):
+                if bounds[p + 1] > bounds[p]:
+                    pairs[bounds[p]:bounds[p + 1]].tofile(spill[p])
+            doc += n
+    finally:
+        for fh in spill:
+            fh.close()
+
+    total = sum((spill_dir / f"{p}.bin").stat().st_size for p in range(partitions)) // PAIR_DTYPE.itemsize
+    postings = np.lib.format.open_memmap(out_dir / "postings.npy", mode="w+", dtype=np.uint32, shape=(total,))
+    counts = np.zeros(N_TRIGRAMS, dtype=np.int64)
+    pos = 0
+    for p in range(partitions):
+        pairs = np.fromfile(spill_dir / f"{p}.bin", dtype=PAIR_DTYPE)
+        # documentos entram em ordem crescente; a ordenação estável mantém isso por trigrama
+        order = np.argsort(pairs["tri"], kind="stable")
+        postings[pos:pos + len(pairs)] = pairs["doc"][order]
+        counts += np.bincount(pairs["tri"], minlength=N_TRIGRAMS)
+        pos += len(pairs)
+    postings.flush()
+    shutil.rmtree(spill_dir, ignore_errors=True)
+
+    offsets = np.zeros(N_TRIGRAMS + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    np.save(out_dir / "offsets.npy", offsets)
+    uf.flush()
+    cnae.flush()
+    return {
+        "docs": n_docs,
+        "pairs": int(total),
+        "uf_labels": list(uf_labels),
+        "cnae_labels": list(cnae_labels),
+    }
+
+
+def index_root():
+    return snapshot_dir() / "nomes"
+
+
+def rebuild_name_index(version, batches):
+    """Monta o índice numa pasta temporária e a troca pela `current`."""
+    root = index_root()
+    staging = root / f"staging-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    meta = build_name_index(staging, batches, partitions=setting("name_index_partitions", 64))
+    meta.update(version=version, built_at=time.strftime("%Y-%m-%d %H:%M:%S"))
+    (staging / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+
+    current, previous = root / "current", root / "previous"
+    shutil.rmtree(previous, ignore_errors=True)
+    if current.exists():
+        current.rename(previous)
+    staging.rename(current)
+    shutil.rmtree(previous, ignore_errors=True)
+    return meta
+
+
+# --- Consulta ----------------------------------------------------------------
+class NameIndex:
+    """
+    Índice de trigramas aberto por memory map.
+
+    A busca tem duas fases: as listas dos trigramas mais raros da consulta
+    geram os candidatos (contando quantos trigramas cada um compartilha), e
+    os melhores candidatos são reavaliados com o texto completo. A nota é a
+    fração dos trigramas da consulta presentes no nome, o que tolera erros
+    de digitação: uma letra trocada derruba só os trigramas vizinhos.
+    """
+
+    def __init__(self, path):
+        path = Path(path)
+        self.meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        self.offsets = np.load(path / "offsets.npy", mmap_mode="r")
+        self.postings = np.load(path / "postings.npy", mmap_mode="r")
+        self.uf = np.load(path / "uf.npy", mmap_mode="r")
+        self.cnae = np.load(path / "cnae.npy", mmap_mode="r")
+        self.docs = pa.ipc.open_file(pa.memory_map(str(path / "docs.arrow"))).read_all()
+        self.uf_labels = self.meta["uf_labels"]
+        self.cnae_labels = self.meta["cnae_labels"]
+
+    def _codes(self, labels, selected):
+        lookup = {label: code for code, label in enumerate(labels)}
+        return np.array([lookup[s] for s in selected if s in lookup], dtype=np.int64)
+
+    def search(self, query, k=50, ufs=(), cnaes=(), min_score=0.5):
+        """
+        Top-k empresas para `query`, opcionalmente restritas a UFs e CNAEs.
+
+        Devolve um DataFrame com DOC_COLUMNS e a coluna SCORE (0 a 1).
+        """
+        folded = fold(query)
+        query_tris = trigrams(folded) if folded else set()
+        if not query_tris:
+            return self.docs.slice(0, 0).to_pandas().assign(SCORE=[])
+
+        lists = sorted(
+            (self.postings[self.offsets[t]:self.offsets[t + 1]] for t in query_tris),
+            key=len,
+        )
+        budget = setting("name_search_max_postings", 5_000_000)
+        chosen, size = [], 0
+        for ids in lists:
+            if chosen and size + len(ids) > budget:
+                break
+            chosen.append(ids)
+            size += len(ids)
+        if size == 0:
+            return self.docs.slice(0, 0).to_pandas().assign(SCORE=[])
+        ids, shared = np.unique(np.concatenate(chosen), return_counts=True)
+
+        if len(ufs):
+            keep = np.isin(self.uf[ids], self._codes(self.uf_labels, ufs))
+            ids, shared = ids[keep], shared[keep]
+        if len(cnaes):
+            keep = np.isin(self.cnae[ids], self._codes(self.cnae_labels, cnaes))
+            ids, shared = ids[keep], shared[keep]
+
+        # exige parte dos trigramas raros e reavalia só os melhores candidatos
+        needed = max(1, math.floor(len(chosen) * min_score))
+        keep = shared >= needed
+        ids, shared = ids[keep], shared[keep]
+        limit = setting("name_search_rescore", 2000)
+        if len(ids) > limit:
+            top = np.argpartition(-shared, limit)[:limit]
+            ids = ids[top]
+        ids = np.sort(ids)
+
+        candidates = self.docs.take(pa.array(ids))
+        razao = candidates.column("RAZAO_SOCIAL").to_pylist()
+        fantasia = candidates.column("NOME_FANTASIA").to_pylist()
+        scores = np.empty(len(ids))
+        for i, (r, f) in enumerate(zip(razao, fantasia)):
+            text = doc_text(r, f)
+            doc_tris = trigrams(text)
+            common = len(query_tris & doc_tris)
+            coverage = common / len(query_tris)
+            dice = 2 * common / (len(query_tris) + len(doc_tris))
+            scores[i] = coverage + 0.1 * dice + (0.05 if folded in text else 0)
+        scores = np.minimum(scores / 1.15, 1.0)
+
+        good = np.flatnonzero(scores >= min_score)
+        best = good[np.argsort(-scores[good], kind="stable")[:k]]
+        result = candidates.take(pa.array(best)).to_pandas()
+        result["SCORE"] = np.round(scores[best], 3)
+        return result
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _open_name_index(built_at):
+    return NameIndex(index_root() / "current")
+
+
+def get_name_index():
+    """Índice de nomes mais recente, ou None se ainda não foi gerado."""
+    try:
+        meta = json.loads((index_root() / "current" / "meta.json").read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return _open_name_index(meta["built_at"])
+
+
+# --- Linha de comando --------------------------------------------------------
+def main():
+    """Gera o índice de nomes da versão atual dos dados (rodar após cada carga)."""
+    logging.basicConfig(level=logging.INFO)
+    version = data_version()
+    started = time.perf_counter()
+    meta = rebuild_name_index(version, iter_arrow(f"SELECT {', '.join(DOC_COLUMNS)} FROM TB_MVP_CONS"))
+    logger.info(
+        "Índice de nomes gerado: %s documentos, %s pares, %.0fs",
+        meta["docs"], meta["pairs"], time.perf_counter() - started,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import functools
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+import streamlit as st
+
+from dados.config import setting
+from dados.execucao import Cancelled, current_job
+from dados.conexao import run_with_connection
+from dados.leitura import read_with
+from dados.metricas import timed
+
+
+BASE_TABLES = ("TB_MVP_CONS", "TB_CNAE_DESCR", "TB_UF_MUNICIPIO", "TB_CNAE_UF", "TB_CNAE_UF_MUNICIPIO")
+
+SHOW_TABLES_SQL = "SHOW TABLES LIKE 'TB_%' IN SCHEMA"
+
+
+# --- Versão dos dados --------------------------------------------------------
+@st.cache_data(show_spinner=False, ttl=setting("data_version_ttl", 300))
+def data_version():
+    """
+    Carimbo da última carga das tabelas base.
+
+    Vem do SHOW TABLES, que só lê metadados nos serviços de nuvem e não
+    retoma o warehouse (consultas ao INFORMATION_SCHEMA retomariam). O
+    carimbo junta o created_on mais recente a um resumo de created_on, rows
+    e bytes de cada tabela base: uma recarga, seja recriando a tabela ou
+    regravando as linhas, muda algum deles. Tudo que é cacheado por
+    resultado inclui este carimbo na chave, então uma nova carga da RFB
+    invalida o cache sozinha.
+    """
+    return run_with_connection(read_with, SHOW_TABLES_SQL, None, _version_from_show)
+
+
+def _version_from_show(cur):
+    columns = [d[0].lower() for d in cur.description]
+    tables = sorted(
+        (row["name"], str(row["created_on"]), row["rows"], row["bytes"])
+        for row in (dict(zip(columns, values)) for values in cur.fetchall())
+        if row["name"] in BASE_TABLES
+    )
+    if not tables:
+        raise RuntimeError("Tabelas base não encontradas no schema atual")
+    digest = hashlib.sha1(repr(tables).encode()).hexdigest()[:12]
+    return f"{max(t[1] for t in tables)} {digest}"
+
+
+# --- Execuções compartilhadas -----------------------------------------------
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Junta chamadas idênticas e simultâneas numa única execução.
+
+    A primeira chamada de uma chave executa `fn`; as que chegam enquanto ela
+    roda esperam e recebem o mesmo valor (ou a mesma exceção). Se a primeira
+    foi cancelada ou interrompida por um rerun da sessão dela, as que
+    esperavam tentam de novo por conta própria. `coalesced` conta as
+    execuções evitadas.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """Retorna (valor, coalescido)."""
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                    self.executions += 1
+                else:
+                    self.coalesced += 1
+            if leader:
+                return self._lead(key, flight, fn), False
+            job = current_job()
+            while not flight.done.wait(setting("job_poll_interval", 0.5)):
+                if job is not None:
+                    job.check_cancelled()
+            if flight.error is None:
+                return flight.value, True
+            if isinstance(flight.error, Exception) and not isinstance(flight.error, Cancelled):
+                raise flight.error
+            with self._lock:
+                self.coalesced -= 1
+
+    def _lead(self, key, flight, fn):
+        try:
+            flight.value = fn()
+            return flight.value
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": len(self._flights),
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+            }
+
+
+@st.cache_resource(show_spinner=False)
+def get_single_flight():
+    """Execuções em andamento no processo, compartilhadas por todas as sessões."""
+    return SingleFlight()
+
+
+# --- Cache de resultados -----------------------------------------------------
+def estimate_size(value):
+    """Bytes aproximados ocupados por um resultado cacheado."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True, index=True).sum())
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """
+    Cache LRU de resultados compartilhado entre sessões.
+
+    A soma estimada dos resultados guardados não passa de `max_bytes`: ao
+    inserir, os menos usados recentemente saem primeiro. Entradas com mais de
+    `ttl` segundos são tratadas como ausentes. Os valores são devolvidos sem
+    cópia, portanto quem lê não deve alterá-los.
+    """
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # chave -> (valor, bytes, momento)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _lookup(self, key):
+        """Entrada válida de `key` ou None, sem mexer nos contadores (chamar com o lock)."""
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[2] > self.ttl:
+            self._drop(key)
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key):
+        """Retorna (achou, valor)."""
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key, value):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """
+        Valor de `key`, calculado por `compute()` se ausente.
+
+        Sessões que pedem a mesma chave ao mesmo tempo compartilham um único
+        `compute()` (SingleFlight); retorna (valor, coalescido).
+        """
+        found, value = self.get(key)
+        if found:
+            return value, False
+
+        def fill():
+            # quem chegou logo depois de outra execução terminar acha o valor
+            # aqui; a falta já foi contada acima
+            with self._lock:
+                entry = self._lookup(key)
+            if entry is not None:
+                return entry[0]
+            value = compute()
+            self.put(key, value)
+            return value
+
+        return get_single_flight().do(key, fill)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+@st.cache_resource(show_spinner=False)
+def get_result_cache():
+    """Cache único do processo, compartilhado por todas as sessões."""
+    return ResultCache(
+        max_bytes = setting("result_cache_mb", 512) * 1024 * 1024,
+        ttl       = setting("result_cache_ttl", 6 * 3600),
+    )
+
+
+def result_cached(kind):
+    """
+    Decorador que guarda o retorno no ResultCache compartilhado.
+
+    A chave é (kind, versão dos dados, argumentos); os argumentos precisam
+    ser hashable e já normalizados (ex.: Filtros.of).
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (kind, data_version(), args, tuple(sorted(kwargs.items())))
+            with timed(f"cache:{kind}") as event:
+                event["hit"] = True
+
+                def compute():
+                    event["hit"] = False
+                    return fn(*args, **kwargs)
+
+                value, event["coalesced"] = get_result_cache().get_or_compute(key, compute)
+                return value
+        return wrapper
+    return decorator
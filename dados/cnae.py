@@ -0,0 +1,178 @@
+from dataclasses import dataclass
+
+import numpy as np
+import streamlit as st
+
+from dados.busca import fold_code
+from dados.snapshot import current_version, load_table
+
+
+# --- Estrutura da CNAE 2.x ---------------------------------------------------
+# O código da subclasse tem 7 dígitos e carrega a hierarquia inteira:
+#   divisão = 2 primeiros dígitos, grupo = 3, classe = 5 (com o dígito
+#   verificador) e subclasse = 7. As seções (letras) são faixas de divisões.
+# Por isso qualquer nó da árvore vira uma faixa contínua de CNAE_FISCAL, e a
+# seleção inteira, umas poucas faixas BETWEEN que o Snowflake usa para
+# descartar micro-partições, em vez de um IN com centenas de descrições.
+
+SECTIONS = {
+    "A": ("01", "03", "Agricultura, pecuária, produção florestal, pesca e aquicultura"),
+    "B": ("05", "09", "Indústrias extrativas"),
+    "C": ("10", "33", "Indústrias de transformação"),
+    "D": ("35", "35", "Eletricidade e gás"),
+    "E": ("36", "39", "Água, esgoto, atividades de gestão de resíduos e descontaminação"),
+    "F": ("41", "43", "Construção"),
+    "G": ("45", "47", "Comércio; reparação de veículos automotores e motocicletas"),
+    "H": ("49", "53", "Transporte, armazenagem e correio"),
+    "I": ("55", "56", "Alojamento e alimentação"),
+    "J": ("58", "63", "Informação e comunicação"),
+    "K": ("64", "66", "Atividades financeiras, de seguros e serviços relacionados"),
+    "L": ("68", "68", "Atividades imobiliárias"),
+    "M": ("69", "75", "Atividades profissionais, científicas e técnicas"),
+    "N": ("77", "82", "Atividades administrativas e serviços complementares"),
+    "O": ("84", "84", "Administração pública, defesa e seguridade social"),
+    "P": ("85", "85", "Educação"),
+    "Q": ("86", "88", "Saúde humana e serviços sociais"),
+    "R": ("90", "93", "Artes, cultura, esporte e recreação"),
+    "S": ("94", "96", "Outras atividades de serviços"),
+    "T": ("97", "97", "Serviços domésticos"),
+    "U": ("99", "99", "Organismos internacionais e outras instituições extraterritoriais"),
+}
+
+# nível -> número de dígitos do código
+LEVELS = {"divisao": 2, "grupo": 3, "classe": 5, "subclasse": 7}
+
+
+def code_range(code):
+    """Faixa (início, fim), inclusiva e com 7 dígitos, das subclasses sob `code`."""
+    if code in SECTIONS:
+        first, last, _ = SECTIONS[code]
+        return first + "00000", last + "99999"
+    return code.ljust(7, "0"), code.ljust(7, "9")
+
+
+def merge_ranges(codes):
+    """
+    Faixas de CNAE_FISCAL cobertas pelos nós `codes`, ordenadas e unidas.
+
+    Nós contidos em outro selecionado e faixas vizinhas (divisões 45, 46 e
+    47, por exemplo) viram uma faixa só.
+    """
+    merged = []
+    for lo, hi in sorted(code_range(c) for c in codes):
+        if merged and int(lo) <= int(merged[-1][1]) + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return tuple(merged)
+
+
+def reduce_selection(codes):
+    """Seleção canônica: sem repetições e sem nós já cobertos por um ancestral selecionado."""
+    codes = set(codes)
+    ranges = {c: code_range(c) for c in codes}
+    return tuple(sorted(
+        c for c in codes
+        if not any(o != c and ranges[o][0] <= ranges[c][0] and ranges[c][1] <= ranges[o][1]
+                   and (ranges[o] != ranges[c] or o < c) for o in codes)
+    ))
+
+
+def ranges_mask(codes, ranges):
+    """Máscara numpy de `codes` (inteiros de 7 dígitos) dentro de alguma das faixas."""
+    mask = np.zeros(len(codes), dtype=bool)
+    for lo, hi in ranges:
+        mask |= (codes >= int(lo)) & (codes <= int(hi))
+    return mask
+
+
+# --- Árvore para o seletor ---------------------------------------------------
+@dataclass(frozen=True)
+class CnaeNode:
+    code: str
+    level: str        # secao | divisao | grupo | classe | subclasse
+    label: str
+    subclasses: int
+
+
+def _node_label(code, level, subclasses):
+    count = f"({subclasses} subclasse{'s' if subclasses > 1 else ''})"
+    if level == "secao":
+        return f"Seção {code} – {SECTIONS[code][2]} {count}"
+    if level == "divisao":
+        return f"Divisão {code} {count}"
+    if level == "grupo":
+        return f"Grupo {code[:2]}.{code[2]} {count}"
+    return f"Classe {code[:2]}.{code[2:4]}-{code[4]} {count}"
+
+
+class CnaeTree:
+    """
+    Hierarquia seção > divisão > grupo > classe > subclasse, derivada dos
+    códigos de TB_CNAE_DESCR.
+
+    `options` lista os códigos de todos os nós em ordem de árvore (cada nó
+    seguido dos seus descendentes), para um multiselect; `label(code)` é o
+    texto exibido. As subclasses usam o CODIGO_DESCR da tabela.
+    """
+
+    def __init__(self, subclasses):
+        leaves = {}
+        for codigo, descr in subclasses[["CODIGO", "CODIGO_DESCR"]].dropna().itertuples(index=False):
+            code = fold_code(codigo)
+            if len(code) == 7:
+                leaves[code] = descr
+        counts = {}
+        for code in leaves:
+            for digits in LEVELS.values():
+                counts[code[:digits]] = counts.get(code[:digits], 0) + 1
+            for section, (first, last, _) in SECTIONS.items():
+                if first <= code[:2] <= last:
+                    counts[section] = counts.get(section, 0) + 1
+
+        nodes = {}
+        for section in SECTIONS:
+            if section in counts:
+                nodes[section] = CnaeNode(section, "secao", _node_label(section, "secao", counts[section]), counts[section])
+        by_level = {digits: level for level, digits in LEVELS.items()}
+        for code in sorted(counts):
+            if code in SECTIONS:
+                continue
+            level = by_level[len(code)]
+            label = leaves[code] if level == "subclasse" else _node_label(code, level, counts[code])
+            nodes[code] = CnaeNode(code, level, label, counts[code])
+        self.nodes = nodes
+        # seções primeiro, cada uma seguida das suas divisões e descendentes
+        self.options = []
+        placed = set()
+        for section, (first, last, _) in SECTIONS.items():
+            if section not in nodes:
+                continue
+            self.options.append(section)
+            for code in nodes:
+                if code not in SECTIONS and first <= code[:2] <= last:
+                    self.options.append(code)
+                    placed.add(code)
+        # códigos fora das seções conhecidas ficam no fim, sem seção
+        self.options += [c for c in nodes if c not in SECTIONS and c not in placed]
+
+    def subclasses_in(self, ranges):
+        """Códigos das subclasses dentro das faixas."""
+        return [
+            code for code, node in self.nodes.items()
+            if node.level == "subclasse" and any(lo <= code <= hi for lo, hi in ranges)
+        ]
+
+    def label(self, code):
+        node = self.nodes.get(code)
+        return node.label if node is not None else code
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _cnae_tree(version):
+    return CnaeTree(load_table("TB_CNAE_DESCR"))
+
+
+def get_cnae_tree():
+    """Árvore da versão atual dos dados, montada uma vez e compartilhada entre sessões."""
+    return _cnae_tree(current_version())
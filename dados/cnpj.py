@@ -0,0 +1,175 @@
+import csv
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+import streamlit as st
+
+from dados.config import setting
+from dados.conexao import run_with_connection
+from dados.leitura import fetch_table, read_with
+from dados.sql import Query
+
+
+# --- Normalização e validação ------------------------------------------------
+DV_WEIGHTS_1 = (5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)
+DV_WEIGHTS_2 = (6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)
+
+
+def normalize_cnpj(cnpj, pad=False):
+    """
+    Remove pontos, barras e traços e passa letras para maiúsculas.
+
+    Com `pad`, números que perderam os zeros à esquerda (célula numérica de
+    planilha) são completados até 14 dígitos; só faz sentido na leitura de
+    arquivos: um CNPJ digitado com menos de 14 caracteres é inválido.
+    """
+    cnpj = str(cnpj).strip().translate(str.maketrans("", "", "./-")).upper()
+    if pad and cnpj.isdigit():
+        cnpj = cnpj.zfill(14)
+    return cnpj
+
+
+def _check_digit(base, weights):
+    total = sum((ord(c) - 48) * w for c, w in zip(base, weights))
+    rest = total % 11
+    return "0" if rest < 2 else str(11 - rest)
+
+
+def is_valid_cnpj(cnpj):
+    """
+    Confere tamanho e dígitos verificadores de um CNPJ já normalizado.
+
+    Aceita também o CNPJ alfanumérico (IN RFB 2.229/2024): as 12 primeiras
+    posições podem ter letras, que entram no cálculo pelo código ASCII - 48;
+    os dois dígitos verificadores continuam numéricos.
+    """
+    if len(cnpj) != 14 or not cnpj[12:].isdigit():
+        return False
+    base = cnpj[:12]
+    if not all(c.isdigit() or "A" <= c <= "Z" for c in base):
+        return False
+    if len(set(cnpj)) == 1:
+        return False
+    first = _check_digit(base, DV_WEIGHTS_1)
+    second = _check_digit(base + first, DV_WEIGHTS_2)
+    return cnpj[12:] == first + second
+
+
+# --- Cache negativo ----------------------------------------------------------
+class NegativeCache:
+    """
+    CNPJs válidos consultados recentemente que não existem na base.
+
+    Limitado a `max_entries` (sai o mais antigo) e a `ttl` segundos; a
+    versão dos dados faz parte da chave, então uma nova carga o invalida.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            stored_at = self._entries.get(key)
+            if stored_at is None:
+                return False
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return False
+            self.hits += 1
+            return True
+
+    def add(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = time.monotonic()
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits}
+
+
+@st.cache_resource(show_spinner=False)
+def get_negative_cache():
+    return NegativeCache(
+        max_entries = setting("negative_cache_entries", 50_000),
+        ttl         = setting("negative_cache_ttl", 6 * 3600),
+    )
+
+
+def read_cnpj_upload(uploaded):
+    """
+    Lê a lista de CNPJs de um arquivo CSV ou XLSX enviado pelo usuário.
+
+    Usa a coluna chamada CNPJ, se houver, senão a primeira. Os valores são
+    normalizados e deduplicados, mantendo a ordem do arquivo, e separados em
+    (válidos, inválidos); só os válidos precisam ir ao banco.
+    """
+    if uploaded.name.lower().endswith(".xlsx"):
+        df = pd.read_excel(uploaded, dtype=str)
+    else:
+        head = uploaded.read(4096).decode("utf-8", errors="ignore")
+        uploaded.seek(0)
+        try:
+            sep = csv.Sniffer().sniff(head, delimiters=",;\t|").delimiter
+        except csv.Error:
+            sep = ","
+        df = pd.read_csv(uploaded, sep=sep, dtype=str, encoding="utf-8-sig")
+    if len(df.columns) == 0:
+        return [], []
+    column = next((c for c in df.columns if str(c).strip().upper() == "CNPJ"), df.columns[0])
+    values = [normalize_cnpj(v, pad=True) for v in df[column].dropna()]
+    # arquivo sem cabeçalho: a primeira linha virou o nome da coluna
+    if is_valid_cnpj(normalize_cnpj(column, pad=True)):
+        values.insert(0, normalize_cnpj(column, pad=True))
+    values = list(dict.fromkeys(v for v in values if v))
+    valid = [v for v in values if is_valid_cnpj(v)]
+    invalid = [v for v in values if not is_valid_cnpj(v)]
+    return valid, invalid
+
+
+# --- Consulta em lote --------------------------------------------------------
+def _fetch_chunk(chunk):
+    query = Query("*", "TB_MVP_CONS").where_in("CNPJ", chunk)
+    return run_with_connection(read_with, query, None, fetch_table)
+
+
+def lookup_batches(cnpjs, on_progress=None):
+    """
+    Consulta uma lista grande de CNPJs e gera os lotes Arrow encontrados.
+
+    A lista é dividida em blocos de bulk_chunk_size CNPJs; até bulk_workers
+    blocos rodam ao mesmo tempo, cada um com uma conexão do pool. Novos
+    blocos só são disparados conforme os anteriores são consumidos, então a
+    memória fica limitada a alguns blocos, qualquer que seja a lista.
+    `on_progress(concluídos, total)` é chamado a cada bloco.
+    """
+    size = setting("bulk_chunk_size", 2000)
+    workers = setting("bulk_workers", 4)
+    chunks = [cnpjs[i:i + size] for i in range(0, len(cnpjs), size)]
+    pending_chunks = iter(chunks)
+    done_count = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cnpj-lote") as pool:
+        running = set()
+        for chunk in pending_chunks:
+            running.add(pool.submit(_fetch_chunk, chunk))
+            if len(running) == workers:
+                break
+        while running:
+            finished, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                yield from future.result().to_batches()
+                done_count += 1
+                if on_progress:
+                    on_progress(done_count, len(chunks))
+                chunk = next(pending_chunks, None)
+                if chunk is not None:
+                    running.add(pool.submit(_fetch_chunk, chunk))
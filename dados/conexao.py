@@ -0,0 +1,295 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import snowflake.connector
+from snowflake.connector.errors import DatabaseError
+import streamlit as st
+
+from dados.config import setting
+from dados.metricas import timed
+
+
+# Códigos do Snowflake para sessão expirada / token inválido
+SESSION_EXPIRED_ERRNOS = {390111, 390112, 390114}
+
+
+def is_session_expired(exc):
+    """Indica se a exceção sinaliza que a sessão do Snowflake não vale mais."""
+    return isinstance(exc, DatabaseError) and getattr(exc, "errno", None) in SESSION_EXPIRED_ERRNOS
+
+
+class PoolTimeout(RuntimeError):
+    """Nenhuma conexão ficou disponível dentro do tempo de espera."""
+
+
+# --- Métricas ----------------------------------------------------------------
+class PoolMetrics:
+    """
+    Contadores do pool e histórico das últimas retiradas (checkouts).
+
+    Cada checkout registra o tempo de espera por uma conexão, o tempo em que
+    ela ficou em uso e se foi reaproveitada ou aberta do zero.
+    """
+
+    def __init__(self, history=500):
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.evicted_idle = 0
+        self.health_check_failures = 0
+        self.timeouts = 0
+        self.checkouts = deque(maxlen=history)
+
+    def incr(self, name, n=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def record_checkout(self, wait_s, hold_s, reused, error=None):
+        with self._lock:
+            self.checkouts.append({
+                "ts": time.time(),
+                "wait_ms": round(wait_s * 1000, 2),
+                "hold_ms": round(hold_s * 1000, 2),
+                "reused": reused,
+                "error": error,
+            })
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "created": self.created,
+                "reused": self.reused,
+                "discarded": self.discarded,
+                "evicted_idle": self.evicted_idle,
+                "health_check_failures": self.health_check_failures,
+                "timeouts": self.timeouts,
+                "checkouts": list(self.checkouts),
+            }
+
+
+# --- Pool de conexões --------------------------------------------------------
+class ConnectionPool:
+    """
+    Pool limitado de conexões reaproveitadas entre sessões e páginas.
+
+    - no máximo `max_size` conexões abertas ao mesmo tempo; quem chega depois
+      espera até `checkout_timeout` segundos por uma devolução;
+    - conexões ociosas há mais de `idle_timeout` segundos são fechadas;
+    - conexões ociosas há mais de `health_check_after` segundos passam por um
+      `SELECT 1` antes de serem entregues;
+    - conexões cuja sessão expirou são descartadas e substituídas.
+    """
+
+    def __init__(self, connect, max_size=8, idle_timeout=900,
+                 health_check_after=120, checkout_timeout=30):
+        self._connect = connect
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.checkout_timeout = checkout_timeout
+        self._idle = deque()     # (conexão, momento da devolução)
+        self._open = 0           # conexões abertas (ociosas + em uso)
+        self._cond = threading.Condition()
+        self.metrics = PoolMetrics()
+
+    # -- ciclo de vida ----------------------------------------------------
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _healthy(self, conn, idle_for):
+        if conn.is_closed():
+            return False
+        if idle_for < self.health_check_after:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.fetchone()
+            cur.close()
+            return True
+        except Exception:
+            self.metrics.incr("health_check_failures")
+            return False
+
+    def evict_idle(self):
+        """Fecha as conexões ociosas há mais de `idle_timeout` segundos."""
+        now = time.monotonic()
+        stale = []
+        with self._cond:
+            while self._idle and now - self._idle[0][1] > self.idle_timeout:
+                stale.append(self._idle.popleft()[0])
+                self._open -= 1
+            if stale:
+                self._cond.notify(len(stale))
+        for conn in stale:
+            self._close(conn)
+        self.metrics.incr("evicted_idle", len(stale))
+
+    def _checkout(self):
+        self.evict_idle()
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            with self._cond:
+                while not self._idle and self._open >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.metrics.incr("timeouts")
+                        raise PoolTimeout(
+                            f"Nenhuma conexão disponível após {self.checkout_timeout}s"
+                        )
+                    self._cond.wait(remaining)
+                if self._idle:
+                    # LIFO: a conexão mais recente tem mais chance de estar viva
+                    conn, returned_at = self._idle.pop()
+                else:
+                    conn, returned_at = None, None
+                    self._open += 1
+
+            if conn is None:
+                try:
+                    with timed("connect"):
+                        conn = self._connect()
+                except Exception:
+                    self._release_slot()
+                    raise
+                self.metrics.incr("created")
+                return conn, False
+
+            if self._healthy(conn, time.monotonic() - returned_at):
+                self.metrics.incr("reused")
+                return conn, True
+            self._close(conn)
+            self._release_slot()
+            self.metrics.incr("discarded")
+
+    def _release_slot(self):
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def _checkin(self, conn, discard=False):
+        if discard or conn.is_closed():
+            self._close(conn)
+            self._release_slot()
+            self.metrics.incr("discarded")
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Empresta uma conexão do pool e a devolve ao final do bloco `with`.
+
+        A devolução acontece em qualquer saída do bloco, inclusive as que não
+        são Exception (gerador fechado no meio, rerun/stop do Streamlit);
+        só sessões expiradas são descartadas.
+        """
+        started = time.perf_counter()
+        conn, reused = self._checkout()
+        acquired = time.perf_counter()
+        error = None
+        discard = False
+        try:
+            yield conn
+        except BaseException as exc:
+            error = type(exc).__name__
+            discard = is_session_expired(exc)
+            raise
+        finally:
+            self._checkin(conn, discard=discard)
+            self.metrics.record_checkout(
+                acquired - started, time.perf_counter() - acquired, reused, error
+            )
+
+    def run(self, fn, *args, **kwargs):
+        """
+        Executa fn(conn, *args, **kwargs) com uma conexão do pool.
+
+        Se a sessão tiver expirado no meio do caminho, a conexão é descartada
+        e a chamada é repetida uma vez com uma conexão nova.
+        """
+        try:
+            with self.connection() as conn:
+                return fn(conn, *args, **kwargs)
+        except DatabaseError as exc:
+            if not is_session_expired(exc):
+                raise
+        with self.connection() as conn:
+            return fn(conn, *args, **kwargs)
+
+    def stats(self):
+        with self._cond:
+            state = {"open": self._open, "idle": len(self._idle), "max_size": self.max_size}
+        state.update(self.metrics.snapshot())
+        return state
+
+
+# --- Conexão com o banco -----------------------------------------------------
+def _snowflake_connect():
+    return snowflake.connector.connect(
+        account   = st.secrets["snowflake"]["account"],
+        user      = st.secrets["snowflake"]["user"],
+        password  = st.secrets["snowflake"]["password"],
+        warehouse = st.secrets["snowflake"]["warehouse"],
+        database  = st.secrets["snowflake"]["database"],
+        schema    = st.secrets["snowflake"]["schema"],
+        client_session_keep_alive = True,
+        paramstyle = "qmark",  # binding no servidor (ver dados/sql.py)
+        # teto no servidor; cada leitura ainda usa um limite menor (dados/leitura.py)
+        session_parameters = {
+            "STATEMENT_TIMEOUT_IN_SECONDS": setting("statement_timeout_max", 3600),
+        },
+    )
+
+
+def _duckdb_connect():
+    # dependência só do ambiente de benchmark/desenvolvimento
+    from dados.duckdb_local import connect
+    return connect()
+
+
+# backend -> função que abre uma sessão
+BACKENDS = {
+    "snowflake": _snowflake_connect,
+    "duckdb": _duckdb_connect,
+}
+
+
+@st.cache_resource(show_spinner=False)
+def get_pool():
+    """
+    Pool único do processo, compartilhado por todas as sessões.
+
+    A configuração `backend` escolhe o banco: "snowflake" (padrão) ou
+    "duckdb", o arquivo local gerado por bench/dados_sinteticos.py.
+    """
+    return ConnectionPool(
+        BACKENDS[setting("backend", "snowflake")],
+        max_size           = setting("pool_max_size", 8),
+        idle_timeout       = setting("pool_idle_timeout", 900),
+        health_check_after = setting("pool_health_check_after", 120),
+        checkout_timeout   = setting("pool_checkout_timeout", 30),
+    )
+
+
+def get_connection():
+    """
+    Empresta uma conexão do pool. Use sempre como gerenciador de contexto:
+
+        with get_connection() as conn:
+            ...
+    """
+    return get_pool().connection()
+
+
+def run_with_connection(fn, *args, **kwargs):
+    """Atalho para get_pool().run(...)."""
+    return get_pool().run(fn, *args, **kwargs)
@@ -0,0 +1,27 @@
+import os
+
+import streamlit as st
+
+
+# --- Configuração ------------------------------------------------------------
+def setting(name, default):
+    """
+    Lê um parâmetro da seção [app] de st.secrets.
+
+    A variável de ambiente SWE_<NOME> tem precedência, o que permite ajustar
+    o comportamento sem alterar o secrets.toml. O valor é convertido para o
+    tipo do default informado.
+    """
+    value = os.environ.get(f"SWE_{name.upper()}")
+    if value is None:
+        try:
+            value = st.secrets.get("app", {}).get(name)
+        except FileNotFoundError:
+            value = None
+    if value is None:
+        return default
+    if isinstance(default, bool) and isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "sim", "yes")
+    if default is not None and not isinstance(value, type(default)):
+        return type(default)(value)
+    return value
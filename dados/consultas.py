@@ -0,0 +1,220 @@
+import math
+import time
+from dataclasses import dataclass
+
+import streamlit as st
+
+from dados.agregados import estimate_count
+from dados.cache import result_cached
+from dados.cnae import get_cnae_tree, merge_ranges, reduce_selection
+from dados.config import setting
+from dados.leitura import iter_arrow, read_frame, read_scalar, run_query
+from dados.sql import IN_LIST_MAX, Query, result_scan
+
+
+PAGE_SIZE = 50
+
+# Colunas exibidas nas grades; o registro completo só é lido ao abrir os detalhes
+GRID_COLUMNS = (
+    "CNPJ", "NOME_FANTASIA", "MATRIZ_FILIAL", "PORTE", "CAPITAL", "CNAE_FISCAL", "CNAE_DESCR",
+)
+
+# Ordenações oferecidas nas grades: rótulo -> ORDER BY (CNPJ desempata)
+ORDERS = {
+    "CNPJ": "CNPJ",
+    "Maior capital social": "CAPITAL DESC NULLS LAST, CNPJ",
+    "Nome fantasia": "NOME_FANTASIA NULLS LAST, CNPJ",
+}
+
+
+# --- Filtros -----------------------------------------------------------------
+@dataclass(frozen=True)
+class Filtros:
+    """
+    Filtros das páginas de consulta; listas vazias não restringem nada.
+
+    `cnaes` são nós da árvore CNAE (dados/cnae.py): letra da seção ou o
+    código da divisão, grupo, classe ou subclasse, só com os dígitos.
+    """
+    cnaes: tuple = ()
+    ufs: tuple = ()
+    municipios: tuple = ()
+
+    @classmethod
+    def of(cls, cnaes=(), ufs=(), municipios=()):
+        """
+        Forma canônica: valores sem duplicatas e ordenados.
+
+        Duas seleções com os mesmos itens em outra ordem geram o mesmo objeto,
+        o que dá a mesma chave de cache e o mesmo texto SQL. Nós CNAE já
+        cobertos por um ancestral selecionado são descartados.
+        """
+        return cls(
+            reduce_selection(cnaes),
+            tuple(sorted(set(ufs))),
+            tuple(sorted(set(municipios))),
+        )
+
+    def query(self, select="*"):
+        """
+        Query parametrizada sobre TB_MVP_CONS com estes filtros.
+
+        A seleção CNAE vira faixas de CNAE_FISCAL (BETWEEN), que permitem
+        ao Snowflake pular micro-partições. Com faixas demais (subclasses
+        soltas de toda parte), vira um IN com os códigos das subclasses.
+        """
+        query = Query(select, "TB_MVP_CONS")
+        ranges = merge_ranges(self.cnaes)
+        if len(ranges) <= IN_LIST_MAX:
+            query.where_ranges("CNAE_FISCAL", ranges)
+        else:
+            query.where_in("CNAE_FISCAL", get_cnae_tree().subclasses_in(ranges))
+        return query.where_in("UF", self.ufs).where_in("MUNICIPIO", self.municipios)
+
+
+# --- Consultas paginadas -----------------------------------------------------
+# A pesquisa roda uma vez no Snowflake (run_search) e as linhas ficam lá, no
+# resultado persistido. Páginas, ordenações e exportação leem esse resultado
+# com RESULT_SCAN, em vez de refazer os filtros sobre TB_MVP_CONS ou guardar
+# tudo na memória do app. Sem o id (modo truncado, ou resultado vencido), as
+# leituras voltam a aplicar os filtros na tabela.
+
+def _source(filtros, query_id, select):
+    if query_id is None:
+        return filtros.query(select)
+    return Query(select, result_scan(query_id))
+
+
+@result_cached("search")
+def run_search(filtros):
+    """
+    Executa a pesquisa completa, sem trazer as linhas.
+
+    Retorna (id da consulta, total de linhas, momento da execução); o total
+    é contado sobre o resultado persistido. Pelo cache de resultados,
+    sessões com os mesmos filtros recebem o mesmo id.
+    """
+    query_id = run_query(filtros.query().order_by("CNPJ"))
+    rows = read_scalar(Query("COUNT(*)", result_scan(query_id)))
+    return query_id, int(rows), time.time()
+
+
+@result_cached("page")
+def fetch_page(filtros, after_cnpj=None, skip=0, page_size=PAGE_SIZE, query_id=None, order="CNPJ"):
+    """
+    Busca uma página do resultado, só com as colunas da grade.
+
+    Na ordem por CNPJ a paginação é por chave: `after_cnpj` é o último CNPJ
+    da página anterior e, quando o usuário salta para uma página cujo início
+    ainda não é conhecido, `skip` pula as linhas a partir da chave conhecida
+    mais próxima. Nas demais ordens (ORDERS), `skip` conta desde o início.
+    """
+    query = _source(filtros, query_id, ", ".join(GRID_COLUMNS))
+    if after_cnpj is not None:
+        query.where("CNPJ > ?", after_cnpj)
+    return read_frame(query.order_by(ORDERS[order]).limit(page_size, skip), compact=True)
+
+
+def iter_batches(filtros, query_id=None):
+    """Resultado completo em lotes Arrow, sem materializar tudo de uma vez."""
+    yield from iter_arrow(_source(filtros, query_id, "*").order_by("CNPJ"))
+
+
+@st.cache_data(show_spinner=False, max_entries=256, ttl=3600)
+def fetch_empresa(cnpj):
+    """Registro completo de um CNPJ, para o diálogo de detalhes (None se não existir)."""
+    df = read_frame("SELECT * FROM TB_MVP_CONS WHERE CNPJ = ?", [cnpj])
+    return None if df.empty else df.iloc[0]
+
+
+def open_search(filtros):
+    """
+    Paginador com o total e a primeira página já lidos (corpo do Job da pesquisa).
+
+    O tamanho do resultado é estimado antes, pelos agregados do snapshot.
+    Acima de interactive_max_rows a pesquisa entra em modo truncado: ela não
+    é executada por inteiro, a grade navega só pelas primeiras linhas (na
+    ordem por CNPJ) e o resultado completo fica para a exportação, que grava
+    em disco lote a lote.
+    """
+    estimate = estimate_count(filtros)
+    cap = setting("interactive_max_rows", 500_000)
+    if estimate > cap:
+        search = Paginador(filtros, total=cap, estimate=estimate)
+    else:
+        query_id, total, executed = run_search(filtros)
+        search = Paginador(filtros, total=total, query_id=query_id, executed=executed)
+    if search.total:
+        search.page(1)
+    return search
+
+
+class Paginador:
+    """
+    Estado da paginação de uma pesquisa, guardado em st.session_state.
+
+    Guarda o total de registros, o id da consulta que gerou o resultado
+    (`query_id`, lido com RESULT_SCAN) e, para cada página já visitada na
+    ordem por CNPJ, o CNPJ a partir do qual ela começa. Assim só a página
+    pedida trafega do banco, qualquer que seja o tamanho do resultado.
+
+    No modo truncado a navegação para em `total` e `estimate` guarda o
+    tamanho estimado do resultado completo.
+    """
+
+    def __init__(self, filtros, total, page_size=PAGE_SIZE, estimate=None, query_id=None, executed=None):
+        self.filtros = filtros
+        self.page_size = page_size
+        self.total = total
+        self.estimate = estimate
+        self.total_pages = math.ceil(self.total / page_size)
+        self._query_id = query_id
+        self._executed = executed
+        self._starts = {1: None}
+        self._current = (None, None)
+
+    @property
+    def truncated(self):
+        return self.estimate is not None and self.estimate > self.total
+
+    @property
+    def query_id(self):
+        """Id do resultado no Snowflake, enquanto ele puder ser lido (None se não houver)."""
+        if self._query_id is None or time.time() - self._executed > setting("result_scan_ttl", 23 * 3600):
+            return None
+        return self._query_id
+
+    @property
+    def sortable(self):
+        """Outras ordens além de CNPJ só sobre o resultado persistido."""
+        return self.query_id is not None
+
+    def page(self, number, order="CNPJ"):
+        """DataFrame da página `number` (1-based); reruns na mesma página não consultam o banco."""
+        if self._current[0] == (number, order):
+            return self._current[1]
+        if order == "CNPJ":
+            known = max(p for p in self._starts if p <= number)
+            df = fetch_page(
+                self.filtros,
+                after_cnpj=self._starts[known],
+                skip=(number - known) * self.page_size,
+                page_size=self.page_size,
+                query_id=self.query_id,
+            )
+            if len(df) == self.page_size:
+                self._starts[number + 1] = df["CNPJ"].iloc[-1]
+        else:
+            df = fetch_page(
+                self.filtros,
+                skip=(number - 1) * self.page_size,
+                page_size=self.page_size,
+                query_id=self.query_id,
+                order=order,
+            )
+        self._current = ((number, order), df)
+        return df
+
+    def batches(self):
+        """Lotes Arrow do resultado completo, para a exportação."""
+        return iter_batches(self.filtros, self.query_id)
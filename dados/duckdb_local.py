@@ -0,0 +1,233 @@
+"""
+Banco local em DuckDB no lugar do Snowflake (backend = "duckdb").
+
+Expõe o pedaço da API do snowflake.connector que o app usa (cursor,
+execute/execute_async, fetch_arrow_*, status por id de consulta), sobre um
+arquivo DuckDB com as mesmas tabelas, gerado por bench/dados_sinteticos.py.
+Serve para medir e desenvolver as páginas sem uma conta Snowflake.
+"""
+import enum
+import re
+import threading
+import uuid
+from collections import OrderedDict
+
+import duckdb
+import pyarrow as pa
+import streamlit as st
+
+from dados.config import setting
+
+
+# --- Tradução de SQL ---------------------------------------------------------
+# Construções do Snowflake usadas pelo app e o equivalente no DuckDB.
+TRANSLATIONS = (
+    ("SELECT VALUE::STRING FROM TABLE(FLATTEN(INPUT => PARSE_JSON(?)))",
+     "SELECT UNNEST(CAST(CAST(? AS JSON) AS VARCHAR[]))"),
+    # o DuckDB não tem os metadados do SHOW TABLES; o gerador grava o
+    # carimbo de cada tabela em SWE_TABLE_VERSIONS
+    ("SHOW TABLES LIKE 'TB_%' IN SCHEMA",
+     'SELECT LAST_ALTERED AS "created_on", TABLE_NAME AS "name", 0 AS "rows", 0 AS "bytes" '
+     "FROM SWE_TABLE_VERSIONS"),
+)
+
+CANCEL_SQL = "SELECT SYSTEM$CANCEL_QUERY(?)"
+
+# RESULT_SCAN: o DuckDB não guarda resultados; cada SELECT executado fica
+# registrado por id e TABLE(RESULT_SCAN('<id>')) vira uma subconsulta com o
+# SQL original (os dados do banco local não mudam entre as execuções).
+RESULT_SCAN = re.compile(r"TABLE\(RESULT_SCAN\('([0-9a-fA-F-]+)'\)\)")
+_results = OrderedDict()  # id -> (sql, params)
+_RESULTS_MAX = 4096
+
+
+def translate(sql):
+    for snowflake_sql, duckdb_sql in TRANSLATIONS:
+        sql = sql.replace(snowflake_sql, duckdb_sql)
+    return sql
+
+
+def _prepare(query_id, sql, params):
+    """Traduz o SQL, expande RESULT_SCAN e registra o SELECT sob `query_id`."""
+    sql, params = translate(sql), list(params or [])
+    match = RESULT_SCAN.search(sql)
+    if match:
+        with _queries_lock:
+            if match.group(1) not in _results:
+                raise duckdb.InvalidInputException(f"Resultado {match.group(1)} não encontrado")
+            scan_sql, scan_params = _results[match.group(1)]
+        before = sql[:match.start()].count("?")
+        sql = f"{sql[:match.start()]}({scan_sql}) AS RESULT_SCAN{sql[match.end():]}"
+        params = params[:before] + scan_params + params[before:]
+    if sql.lstrip().upper().startswith("SELECT"):
+        with _queries_lock:
+            _results[query_id] = (sql, params)
+            while len(_results) > _RESULTS_MAX:
+                _results.popitem(last=False)
+    return sql, params
+
+
+class QueryStatus(enum.Enum):
+    RUNNING = "RUNNING"
+    SUCCESS = "SUCCESS"
+    ABORTED = "ABORTED"
+    FAILED_WITH_ERROR = "FAILED_WITH_ERROR"
+
+
+# --- Consultas assíncronas ---------------------------------------------------
+_queries = {}            # id -> _AsyncQuery (todas as conexões do processo)
+_queries_lock = threading.Lock()
+
+
+class _AsyncQuery:
+    """Consulta rodando numa thread, como um execute_async do Snowflake."""
+
+    def __init__(self, query_id, con, sql, params):
+        self.id = query_id
+        self.status = QueryStatus.RUNNING
+        self.table = None
+        self.error = None
+        self._con = con
+        threading.Thread(target=self._run, args=(sql, params), daemon=True).start()
+
+    def _run(self, sql, params):
+        try:
+            self.table = self._con.execute(sql, params).fetch_arrow_table()
+            self.status = QueryStatus.SUCCESS
+        except duckdb.InterruptException as exc:
+            self.error = exc
+            self.status = QueryStatus.ABORTED
+        except Exception as exc:
+            self.error = exc
+            self.status = QueryStatus.FAILED_WITH_ERROR
+
+    def cancel(self):
+        if self.status is QueryStatus.RUNNING:
+            self._con.interrupt()
+
+
+# --- Conexão e cursor --------------------------------------------------------
+class LocalCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self._con = connection._con
+        self.sfqid = None
+        self._table = None       # resultado já materializado (assíncrono)
+        self._async = False
+
+    def execute(self, sql, params=None, timeout=None):
+        self.sfqid = str(uuid.uuid4())
+        self._table = None
+        self._async = False
+        if sql.strip() == CANCEL_SQL:
+            with _queries_lock:
+                query = _queries.get(params[0])
+            if query is not None:
+                query.cancel()
+            self._table = pa.table({"STATUS": ["Identified SQL statement is being canceled."]})
+            return self
+        self._con.execute(*_prepare(self.sfqid, sql, params))
+        return self
+
+    def executemany(self, sql, seq):
+        self._con.executemany(translate(sql), list(seq))
+        return self
+
+    def execute_async(self, sql, params=None):
+        query_id = str(uuid.uuid4())
+        query = _AsyncQuery(query_id, self._con, *_prepare(query_id, sql, params))
+        with _queries_lock:
+            _queries[query.id] = query
+        self.sfqid = query.id
+        return {"queryId": query.id}
+
+    def get_results_from_sfqid(self, query_id):
+        with _queries_lock:
+            query = _queries.pop(query_id)
+        if query.error is not None:
+            raise query.error
+        self.sfqid = query_id
+        self._table = query.table
+        self._async = True
+
+    @property
+    def rowcount(self):
+        # como no conector do Snowflake: depois de get_results_from_sfqid o
+        # total só aparece após a primeira leitura, então aqui fica None;
+        # no execute comum o resultado é materializado para contá-lo
+        if self._async:
+            return None
+        if self._table is None:
+            self._table = self._con.fetch_arrow_table()
+        return self._table.num_rows
+
+    @property
+    def description(self):
+        if self._table is not None:
+            return [(name,) for name in self._table.column_names]
+        return self._con.description
+
+    def fetchall(self):
+        if self._table is not None:
+            return [tuple(row.values()) for row in self._table.to_pylist()]
+        return self._con.fetchall()
+
+    def fetchone(self):
+        if self._table is not None:
+            return tuple(col[0].as_py() for col in self._table.columns) if self._table.num_rows else None
+        return self._con.fetchone()
+
+    def fetch_arrow_all(self, force_return_table=False):
+        if self._table is not None:
+            return self._table
+        return self._con.fetch_arrow_table()
+
+    def fetch_arrow_batches(self):
+        if self._table is not None:
+            yield from (pa.Table.from_batches([b]) for b in self._table.to_batches())
+            return
+        reader = self._con.fetch_record_batch(setting("duckdb_batch_rows", 100_000))
+        for batch in reader:
+            yield pa.Table.from_batches([batch])
+
+    def close(self):
+        pass
+
+
+class LocalConnection:
+    """Uma sessão no banco local; tabelas temporárias ficam nela, como no Snowflake."""
+
+    def __init__(self, database):
+        self._con = database.cursor()
+        self._closed = False
+
+    def cursor(self):
+        return LocalCursor(self)
+
+    def get_query_status_throw_if_error(self, query_id):
+        with _queries_lock:
+            query = _queries[query_id]
+        if query.status is QueryStatus.FAILED_WITH_ERROR:
+            raise query.error
+        return query.status
+
+    def is_still_running(self, status):
+        return status is QueryStatus.RUNNING
+
+    def close(self):
+        if not self._closed:
+            self._con.close()
+            self._closed = True
+
+    def is_closed(self):
+        return self._closed
+
+
+@st.cache_resource(show_spinner=False)
+def _database(path):
+    return duckdb.connect(path, read_only=True)
+
+
+def connect():
+    """Nova sessão no arquivo duckdb_path (mesma assinatura de uso do Snowflake)."""
+    return LocalConnection(_database(setting("duckdb_path", "bench/swe.duckdb")))
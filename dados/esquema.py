@@ -0,0 +1,61 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import streamlit as st
+
+
+LAYOUT_PATH = Path(__file__).resolve().parent.parent / "layout" / "dicionario.json"
+
+
+# --- Tipos das colunas -------------------------------------------------------
+# O dicionário de dados (layout/dicionario.json) diz, para cada variável de
+# TB_MVP_CONS, se ela é:
+#   - "categoria": poucos valores repetidos (UF, município, CNAE, porte...),
+#     guardada como pandas.Categorical: um código inteiro por linha;
+#   - "numero": convertida para float64 (NUMBER do Snowflake chega como decimal);
+#   - "texto": string em Arrow (pd.StringDtype("pyarrow")), sem um objeto
+#     Python por célula.
+
+@st.cache_data(show_spinner=False)
+def column_types():
+    """{COLUNA: tipo} a partir do dicionário de dados."""
+    layout = json.loads(LAYOUT_PATH.read_text(encoding="utf-8"))
+    return {name.upper(): meta["tipo"] for name, meta in layout.items()}
+
+
+def _compact_column(column, kind):
+    if kind == "categoria" and not pa.types.is_dictionary(column.type):
+        return pc.dictionary_encode(column.cast(pa.string()) if pa.types.is_integer(column.type) else column)
+    if kind == "numero" and (pa.types.is_decimal(column.type) or pa.types.is_integer(column.type)):
+        return column.cast(pa.float64())
+    return column
+
+
+def _string_dtype(arrow_type):
+    if arrow_type in (pa.string(), pa.large_string()):
+        return pd.StringDtype("pyarrow")
+    return None
+
+
+def to_frame(table):
+    """
+    pyarrow.Table -> DataFrame com os tipos compactos do dicionário de dados.
+
+    Colunas fora do dicionário seguem a conversão padrão, com strings em Arrow.
+    """
+    types = column_types()
+    columns = [
+        _compact_column(table.column(i), types.get(name))
+        for i, name in enumerate(table.column_names)
+    ]
+    table = pa.Table.from_arrays(columns, names=table.column_names)
+    return table.to_pandas(types_mapper=_string_dtype)
+
+
+def read_parquet_frame(path):
+    """Relê um DataFrame gravado com to_parquet mantendo as strings em Arrow."""
+    return pq.read_table(path).to_pandas(types_mapper=_string_dtype)
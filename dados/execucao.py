@@ -0,0 +1,200 @@
+import itertools
+import logging
+import threading
+import time
+
+import streamlit as st
+
+from dados.config import setting
+from dados.conexao import run_with_connection
+from dados.metricas import current_page, set_page, timed
+
+
+logger = logging.getLogger(__name__)
+
+
+class Cancelled(Exception):
+    """A pesquisa foi cancelada pelo usuário."""
+
+
+class StatementTimeout(RuntimeError):
+    """Uma consulta da pesquisa passou do tempo limite e foi abortada."""
+
+
+# --- Pesquisas em segundo plano ----------------------------------------------
+# O clique em "Pesquisar" só dispara um Job; a consulta roda numa thread e
+# cada comando vai ao Snowflake com execute_async. O script da página volta
+# na hora e acompanha o Job (estado, id da consulta, linhas lidas) a partir
+# do st.session_state, podendo cancelá-lo no servidor.
+
+_job_ids = itertools.count(1)
+_current = threading.local()
+
+
+class Job:
+    """Uma pesquisa em andamento, guardada no st.session_state da página."""
+
+    def __init__(self, label, fn, *args, **kwargs):
+        self.id = next(_job_ids)
+        self.label = label
+        self.state = "running"       # running | done | error | cancelled
+        self.status = "SUBMITTING"   # status da consulta atual no Snowflake
+        self.query_id = None
+        self.query_ids = []
+        self.rows = 0
+        self.result = None
+        self.error = None
+        self.started = time.monotonic()
+        self.finished = None
+        self.page = current_page()
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(fn, args, kwargs), name=f"job-{self.id}", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, fn, args, kwargs):
+        _current.job = self
+        set_page(self.page)
+        try:
+            self.result = fn(*args, **kwargs)
+            self.state = "done"
+        except Cancelled:
+            self.state = "cancelled"
+        except Exception as exc:
+            if self._cancel.is_set():
+                self.state = "cancelled"
+            else:
+                logger.exception("Falha na pesquisa %s", self.label)
+                self.error = exc
+                self.state = "error"
+        finally:
+            _current.job = None
+            self.finished = time.monotonic()
+
+    @property
+    def done(self):
+        return self.state != "running"
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    def cancel(self):
+        """Interrompe a pesquisa e aborta no servidor a consulta que estiver rodando."""
+        if self.done:
+            return
+        self._cancel.set()
+        query_id = self.query_id
+        if query_id:
+            try:
+                run_with_connection(_cancel_query, query_id)
+            except Exception:
+                logger.exception("Falha ao cancelar a consulta %s", query_id)
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise Cancelled()
+
+
+def _cancel_query(conn, query_id):
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT SYSTEM$CANCEL_QUERY(?)", [query_id])
+    finally:
+        cur.close()
+
+
+def current_job():
+    """Job da thread atual (None fora de uma pesquisa em segundo plano)."""
+    return getattr(_current, "job", None)
+
+
+def run_statement(cur, sql, params, timeout=None):
+    """
+    Executa um comando no cursor, abortando-o após `timeout` segundos.
+
+    Dentro de um Job, usa execute_async e acompanha o status até o fim,
+    registrando o id da consulta para o cancelamento; o resultado é então
+    ligado ao cursor com get_results_from_sfqid. Fora de um Job, é um
+    cur.execute comum.
+    """
+    job = current_job()
+    with timed("execute", background=job is not None) as event:
+        if job is None:
+            cur.execute(sql, params, timeout=timeout)
+        else:
+            _run_async(job, cur, sql, params, timeout)
+        event["query_id"] = cur.sfqid
+    return cur
+
+
+def _run_async(job, cur, sql, params, timeout):
+    job.check_cancelled()
+    cur.execute_async(sql, params)
+    query_id = cur.sfqid
+    job.query_id = query_id
+    job.query_ids.append(query_id)
+    conn = cur.connection
+    deadline = time.monotonic() + timeout if timeout else None
+    delay = 0.05
+    while True:
+        status = conn.get_query_status_throw_if_error(query_id)
+        job.status = status.name
+        if not conn.is_still_running(status):
+            break
+        if job._cancel.is_set():
+            # cancel() pode ter chegado antes do id; garante o aborto no servidor
+            _cancel_query(conn, query_id)
+            raise Cancelled()
+        if deadline is not None and time.monotonic() > deadline:
+            _cancel_query(conn, query_id)
+            raise StatementTimeout(f"Consulta {query_id} abortada após {timeout}s")
+        time.sleep(delay)
+        delay = min(delay * 2, setting("job_poll_interval", 0.5))
+    cur.get_results_from_sfqid(query_id)
+
+
+def note_rows(n):
+    """Soma `n` linhas lidas ao Job atual, para o progresso na tela."""
+    job = current_job()
+    if job is not None:
+        job.rows += n
+        job.check_cancelled()
+
+
+# --- Acompanhamento na tela --------------------------------------------------
+STATUS_LABELS = {
+    "SUBMITTING": "enviando",
+    "QUEUED": "na fila do warehouse",
+    "RESUMING_WAREHOUSE": "ligando o warehouse",
+    "RUNNING": "executando",
+    "SUCCESS": "lendo resultado",
+}
+
+
+@st.fragment(run_every=setting("job_refresh", 1.0))
+def render_job(job, key):
+    """
+    Andamento de `job` (status, tempo, linhas lidas) com o botão Cancelar.
+
+    Só este trecho da página é redesenhado a cada segundo; quando o Job
+    termina, a página inteira é executada de novo para mostrar o resultado.
+    """
+    if job.done:
+        st.rerun()
+    status = STATUS_LABELS.get(job.status, job.status.lower())
+    st.info(f"⏳ {job.label}: {status} · {job.elapsed:.0f}s · {job.rows:,} linhas lidas".replace(",", "."))
+    if job.query_id:
+        st.caption(f"Consulta Snowflake: {job.query_id}")
+    if st.button("Cancelar", key=f"{key}_cancel"):
+        job.cancel()
+        st.rerun()
+
+
+def show_job_outcome(job):
+    """Mensagem para um Job que terminou sem resultado (cancelado ou com erro)."""
+    if job.state == "cancelled":
+        st.warning("Pesquisa cancelada.")
+    elif job.state == "error":
+        st.error(f"A pesquisa falhou: {job.error}")
@@ -0,0 +1,249 @@
+import hashlib
+import itertools
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+import streamlit as st
+import xlsxwriter
+
+from dados.cache import data_version, get_single_flight
+from dados.config import setting
+from dados.metricas import timed
+
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+XLSX_MAX_ROWS = 1_048_576  # linhas por aba, contando o cabeçalho
+
+
+# --- Arquivos de exportação --------------------------------------------------
+def export_dir():
+    path = Path(setting("export_dir", os.path.join(tempfile.gettempdir(), "swe-exports")))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def export_path(signature, ext):
+    """
+    Caminho do arquivo exportado para um resultado.
+
+    O nome deriva da assinatura do resultado (filtros normalizados) e da
+    versão dos dados, então a mesma consulta reaproveita o arquivo já gerado,
+    inclusive entre sessões, até a próxima carga.
+    """
+    digest = hashlib.sha1(repr((data_version(), signature)).encode()).hexdigest()[:20]
+    return export_dir() / f"{digest}.{ext}"
+
+
+def _size(path):
+    """Tamanho do arquivo, ou None se outra sessão já o apagou."""
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return None
+
+
+def prune_exports(keep=None):
+    """
+    Apaga os arquivos mais antigos quando o diretório passa de export_cache_mb.
+
+    `keep` (o arquivo que acabou de ser gerado) nunca é apagado, mesmo que
+    sozinho passe do limite.
+    """
+    budget = setting("export_cache_mb", 2048) * 1024 * 1024
+    files = []
+    for path in export_dir().iterdir():
+        if path.suffix == ".tmp" or path == keep:
+            continue
+        try:
+            files.append((path, path.stat()))
+        except FileNotFoundError:   # apagado por outra sessão
+            continue
+    files.sort(key=lambda f: f[1].st_mtime)
+    total = sum(stat.st_size for _, stat in files)
+    if keep is not None:
+        total += _size(keep) or 0
+    for path, stat in files:
+        if total <= budget:
+            break
+        total -= stat.st_size
+        path.unlink(missing_ok=True)
+
+
+def unify_batches(batches):
+    """
+    Normaliza o schema dos lotes Arrow vindos do Snowflake.
+
+    O conector escolhe a largura dos inteiros por lote (int8, int16, ...),
+    mas Parquet e Arrow IPC exigem um schema único por arquivo. Os inteiros
+    são promovidos a int64 e todos os lotes convertidos para o schema do
+    primeiro.
+    """
+    schema = None
+    for batch in batches:
+        if schema is None:
+            schema = pa.schema([
+                f.with_type(pa.int64()) if pa.types.is_integer(f.type) else f
+                for f in batch.schema
+            ])
+        if batch.schema != schema:
+            batch = pa.Table.from_batches([batch]).cast(schema).combine_chunks().to_batches()[0]
+        yield batch
+
+
+def _peek(batches):
+    """Retorna (primeiro lote ou None, iterador com todos os lotes)."""
+    batches = iter(batches)
+    first = next(batches, None)
+    if first is None:
+        return None, iter(())
+    return first, itertools.chain([first], batches)
+
+
+def write_xlsx(path, batches, sheet_name="Empresas"):
+    """
+    Grava os lotes em planilha, linha a linha.
+
+    Usa o modo constant_memory do xlsxwriter: cada linha vai para o disco
+    assim que é escrita, então a memória não cresce com o tamanho do
+    resultado. Passando do limite de linhas do Excel, os registros continuam
+    em novas abas ("Empresas (2)", ...), cada uma com cabeçalho.
+    """
+    workbook = xlsxwriter.Workbook(str(path), {
+        "constant_memory": True,
+        "strings_to_urls": False,
+        "strings_to_formulas": False,
+    })
+    sheet, row, sheets = None, XLSX_MAX_ROWS, 0
+    header = []
+    for batch in batches:
+        frame = batch.to_pandas()
+        header = list(frame.columns)
+        frame = frame.astype(object).where(frame.notna(), None)
+        for values in frame.itertuples(index=False, name=None):
+            if row == XLSX_MAX_ROWS:
+                sheets += 1
+                sheet = workbook.add_worksheet(sheet_name if sheets == 1 else f"{sheet_name} ({sheets})")
+                sheet.write_row(0, 0, header)
+                row = 1
+            sheet.write_row(row, 0, values)
+            row += 1
+    if sheet is None:
+        workbook.add_worksheet(sheet_name).write_row(0, 0, header)
+    workbook.close()
+
+
+def write_csv_gz(path, batches):
+    """CSV compactado com gzip, escrito lote a lote."""
+    first, batches = _peek(unify_batches(batches))
+    with pa.CompressedOutputStream(str(path), "gzip") as sink:
+        if first is None:
+            return
+        with pacsv.CSVWriter(sink, first.schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+
+
+def write_parquet(path, batches):
+    first, batches = _peek(unify_batches(batches))
+    schema = first.schema if first is not None else pa.schema([])
+    with pq.ParquetWriter(str(path), schema, compression="zstd") as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+
+
+def write_arrow(path, batches):
+    """Arquivo Arrow IPC (Feather v2)."""
+    first, batches = _peek(unify_batches(batches))
+    schema = first.schema if first is not None else pa.schema([])
+    with pa.ipc.new_file(str(path), schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+
+
+# extensão -> (rótulo, mime, função de escrita)
+FORMATS = {
+    "xlsx":    ("Excel", XLSX_MIME, write_xlsx),
+    "csv.gz":  ("CSV (gzip)", "application/gzip", write_csv_gz),
+    "parquet": ("Parquet", "application/vnd.apache.parquet", write_parquet),
+    "arrow":   ("Arrow IPC", "application/vnd.apache.arrow.file", write_arrow),
+}
+
+
+def build_export(signature, batches_fn, ext, **kwargs):
+    """
+    Gera (ou reaproveita) o arquivo do resultado no formato `ext`.
+
+    `batches_fn()` deve devolver os lotes Arrow do resultado; eles vão do
+    warehouse direto para o arquivo, sem montar o DataFrame completo.
+    Sessões que pedem o mesmo arquivo ao mesmo tempo esperam uma única
+    geração.
+    """
+    path = export_path(signature, ext)
+
+    def write():
+        if path.exists():
+            return _size(path)
+        partial = path.with_name(f"{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+        FORMATS[ext][2](partial, batches_fn(), **kwargs)
+        size = partial.stat().st_size
+        os.replace(partial, path)
+        prune_exports(keep=path)
+        return size
+
+    with timed("export", format=ext, reused=path.exists()) as event:
+        if event["reused"]:
+            event["bytes"] = _size(path)
+        else:
+            event["bytes"], event["coalesced"] = get_single_flight().do(("export", str(path)), write)
+    return path
+
+
+# --- Componente de download --------------------------------------------------
+def render_export(key, signature, batches_fn, file_name, sheet_name="Empresas",
+                  label="📥 Baixar dados filtrados",
+                  help="Exporta todos os registros que atendem aos filtros"):
+    """
+    Botão de exportação sob demanda, com escolha de formato.
+
+    Nada é gerado enquanto o usuário não pede: o primeiro clique monta o
+    arquivo a partir dos lotes de `batches_fn()` e os reruns seguintes (troca
+    de página, clique na grade) só reaproveitam o arquivo pronto.
+    `file_name` é informado sem extensão.
+    """
+    ext = st.radio(
+        "Formato:",
+        options=list(FORMATS),
+        format_func=lambda e: FORMATS[e][0],
+        horizontal=True,
+        key=f"fmt_{key}",
+    )
+    name, mime, _ = FORMATS[ext]
+    kwargs = {"sheet_name": sheet_name} if ext == "xlsx" else {}
+    path = export_path(signature, ext)
+    if not path.exists():
+        if not st.button(f"Preparar exportação ({name})", key=f"prep_{key}"):
+            return
+        with st.spinner("Gerando arquivo..."):
+            path = build_export(signature, batches_fn, ext, **kwargs)
+    try:
+        fh = open(path, "rb")
+    except FileNotFoundError:
+        # outra sessão apagou o arquivo (prune_exports) depois da checagem
+        # acima: é um miss como outro qualquer, gera de novo
+        with st.spinner("Gerando arquivo..."):
+            path = build_export(signature, batches_fn, ext, **kwargs)
+        fh = open(path, "rb")
+    with fh:
+        st.download_button(
+            label=f"{label} ({name})",
+            data=fh,
+            file_name=f"{file_name}.{ext}",
+            mime=mime,
+            help=help,
+            key=f"dl_{key}",
+        )
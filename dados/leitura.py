@@ -0,0 +1,97 @@
+from dados.config import setting
+from dados.conexao import get_connection, run_with_connection
+from dados.esquema import to_frame
+from dados.execucao import note_rows
+from dados.metricas import timed
+from dados.sql import cleanup, execute
+
+
+# --- Leitura colunar (Arrow) -------------------------------------------------
+# O conector entrega os resultados do Snowflake em lotes Arrow; convertê-los
+# direto em DataFrame evita criar uma tupla Python por linha (fetchall) e já
+# devolve colunas tipadas.
+#
+# Leituras que alimentam a tela usam statement_timeout; as que gravam em disco
+# lote a lote (exportação, snapshot) usam stream_statement_timeout, maior.
+
+def fetch_table(cur):
+    """Resultado completo do cursor como pyarrow.Table (com schema mesmo se vazio)."""
+    with timed("fetch", query_id=cur.sfqid) as event:
+        table = cur.fetch_arrow_all(force_return_table=True)
+        event.update(rows=table.num_rows, bytes=table.nbytes)
+    note_rows(table.num_rows)
+    return table
+
+
+def fetch_frame(cur, compact=False):
+    """
+    Resultado completo do cursor como DataFrame, montado a partir do Arrow.
+
+    Com `compact`, as colunas recebem os tipos do dicionário de dados
+    (dados/esquema.py): categorias, números e strings em Arrow.
+    """
+    table = fetch_table(cur)
+    with timed("frame", rows=table.num_rows, compact=compact):
+        return to_frame(table) if compact else table.to_pandas()
+
+
+def read_with(conn, query, params, read):
+    """
+    Executa `query` num cursor de `conn` e devolve read(cursor).
+
+    Corpo comum das leituras que não são em fluxo; elas passam por
+    run_with_connection, que repete a leitura uma vez com uma conexão nova
+    se a sessão do Snowflake tiver expirado.
+    """
+    cur = conn.cursor()
+    try:
+        execute(cur, query, params, timeout=setting("statement_timeout", 120))
+        result = read(cur)
+        cleanup(cur, query)
+    finally:
+        cur.close()
+    return result
+
+
+def read_frame(query, params=None, compact=False):
+    """Executa `query` (Query ou SQL) com uma conexão do pool e devolve um DataFrame."""
+    return run_with_connection(read_with, query, params, lambda cur: fetch_frame(cur, compact))
+
+
+def read_scalar(query, params=None):
+    """Primeira coluna da primeira linha do resultado."""
+    return run_with_connection(read_with, query, params, lambda cur: cur.fetchone()[0])
+
+
+def run_query(query, params=None):
+    """
+    Executa `query` sem ler as linhas e devolve o id da consulta.
+
+    O resultado fica guardado no Snowflake e pode ser lido depois, em partes,
+    com dados.sql.result_scan(id), de qualquer conexão do mesmo usuário.
+    O total de linhas não vem daqui: depois de execute_async o conector só
+    preenche cur.rowcount quando a primeira leitura é feita.
+    """
+    return run_with_connection(read_with, query, params, lambda cur: cur.sfqid)
+
+
+def iter_arrow(query, params=None):
+    """
+    Gera pyarrow.RecordBatch à medida que chegam do Snowflake.
+
+    A conexão fica emprestada do pool enquanto o gerador é consumido; só um
+    lote por vez fica em memória.
+    """
+    with timed("stream") as event, get_connection() as conn:
+        cur = conn.cursor()
+        try:
+            execute(cur, query, params, timeout=setting("stream_statement_timeout", 3600))
+            event.update(query_id=cur.sfqid, rows=0, bytes=0)
+            for table in cur.fetch_arrow_batches():
+                note_rows(table.num_rows)
+                event["rows"] += table.num_rows
+                event["bytes"] += table.nbytes
+                yield from table.to_batches()
+            cleanup(cur, query)
+        finally:
+            cur.close()
@@ -0,0 +1,254 @@
+import atexit
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+import streamlit as st
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from dados.cache import estimate_size
+from dados.config import setting
+from dados.esquema import read_parquet_frame
+
+
+logger = logging.getLogger(__name__)
+
+
+# --- Resultados por sessão ---------------------------------------------------
+class SessionFrames:
+    """
+    DataFrames de resultado das sessões, com um orçamento de memória único
+    para o processo.
+
+    Quando a soma passa de `max_bytes`, os resultados usados há mais tempo
+    (de qualquer sessão) são gravados em Parquet em `spill_dir` e saem da
+    memória; o próximo get() os relê do disco sem que a página perceba.
+    Sessões que o Streamlit já encerrou, ou paradas há mais de `idle_timeout`
+    segundos, são descartadas junto com seus arquivos.
+
+    O lock do processo só protege a contabilidade; a gravação e a leitura do
+    Parquet acontecem fora dele, com a entrada marcada ("io") para que outra
+    sessão não use o mesmo arquivo ao mesmo tempo.
+    """
+
+    def __init__(self, max_bytes, spill_dir, idle_timeout):
+        self.max_bytes = max_bytes
+        self.spill_dir = Path(spill_dir)
+        self.idle_timeout = idle_timeout
+        self._entries = OrderedDict()   # (sessão, nome) -> {"frame", "path", "bytes", "io", "pending"}
+        self._last_seen = {}            # sessão -> momento do último acesso
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._io_done = threading.Condition(self._lock)
+        self._last_sweep = 0.0
+        self.spills = 0
+        self.reloads = 0
+        self.evicted_sessions = 0
+
+    # -- memória ----------------------------------------------------------
+    def _pick_spills(self, keep):
+        """
+        Tira da memória os resultados mais antigos até caber no orçamento
+        (com o lock). Os que ainda não têm arquivo ficam marcados como
+        "spilling" e são devolvidos para _spill() gravá-los sem o lock.
+        """
+        victims = []
+        for key in list(self._entries):
+            if self._bytes <= self.max_bytes:
+                break
+            entry = self._entries[key]
+            if key == keep or entry["frame"] is None:
+                continue
+            if entry["path"] is None:
+                entry["path"] = self.spill_dir / f"{uuid.uuid4().hex}.parquet"
+                entry["io"] = "spilling"
+                entry["pending"] = entry["frame"]
+                victims.append((key, entry))
+            else:
+                self.spills += 1
+            entry["frame"] = None
+            self._bytes -= entry["bytes"]
+        return victims
+
+    def _finish_io(self, key, entry):
+        """Desmarca a entrada (com o lock); se ela saiu nesse meio-tempo, apaga o arquivo."""
+        entry["io"] = entry["pending"] = None
+        self._io_done.notify_all()
+        if self._entries.get(key) is entry:
+            return True
+        entry["path"].unlink(missing_ok=True)
+        return False
+
+    def _spill(self, victims):
+        for key, entry in victims:
+            frame = entry["pending"]
+            try:
+                self.spill_dir.mkdir(parents=True, exist_ok=True)
+                frame.to_parquet(entry["path"])
+            except Exception:
+                logger.exception("Falha ao despejar resultado em %s", entry["path"])
+                with self._lock:
+                    if self._finish_io(key, entry):
+                        # fica em memória, acima do orçamento, até o próximo despejo
+                        entry["path"].unlink(missing_ok=True)
+                        entry["frame"], entry["path"] = frame, None
+                        self._bytes += entry["bytes"]
+                continue
+            with self._lock:
+                if self._finish_io(key, entry):
+                    self.spills += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        if entry["frame"] is not None:
+            self._bytes -= entry["bytes"]
+        # com gravação/leitura em andamento, quem termina apaga o arquivo
+        if entry["path"] is not None and entry["io"] is None:
+            entry["path"].unlink(missing_ok=True)
+
+    def put(self, session, name, frame):
+        key = (session, name)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            size = estimate_size(frame)
+            self._entries[key] = {"frame": frame, "path": None, "bytes": size, "io": None, "pending": None}
+            self._bytes += size
+            self._last_seen[session] = time.monotonic()
+            victims = self._pick_spills(keep=key)
+        self._spill(victims)
+        self.sweep()
+
+    def get(self, session, name):
+        key = (session, name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self._last_seen[session] = time.monotonic()
+            while entry["io"] is not None:
+                if entry["io"] == "spilling":
+                    return entry["pending"]   # ainda em memória, a caminho do disco
+                self._io_done.wait()          # outra sessão está relendo o arquivo
+            if entry["frame"] is not None or self._entries.get(key) is not entry:
+                return entry["frame"]
+            entry["io"] = "loading"
+        try:
+            frame = read_parquet_frame(entry["path"])
+        except BaseException:
+            with self._lock:
+                self._finish_io(key, entry)
+            raise
+        with self._lock:
+            if not self._finish_io(key, entry):
+                return frame
+            entry["frame"] = frame
+            self._bytes += entry["bytes"]
+            self.reloads += 1
+            victims = self._pick_spills(keep=key)
+        self._spill(victims)
+        return frame
+
+    # -- sessões abandonadas ----------------------------------------------
+    def sweep(self, every=60):
+        """Descarta sessões encerradas ou ociosas (no máximo a cada `every` s)."""
+        now = time.monotonic()
+        if now - self._last_sweep < every:
+            return
+        self._last_sweep = now
+        active = runtime.get_instance().is_active_session if runtime.exists() else None
+        with self._lock:
+            gone = [
+                s for s, seen in self._last_seen.items()
+                if now - seen > self.idle_timeout or (active is not None and s != "-" and not active(s))
+            ]
+            for session in gone:
+                for key in [k for k in self._entries if k[0] == session]:
+                    self._remove(key)
+                del self._last_seen[session]
+            self.evicted_sessions += len(gone)
+        if gone:
+            logger.info("Resultados de %s sessões abandonadas descartados", len(gone))
+
+    def stats(self):
+        with self._lock:
+            sessions = {}
+            for (session, _), entry in self._entries.items():
+                usage = sessions.setdefault(session, {"session": session, "memory_bytes": 0, "spilled_bytes": 0, "frames": 0})
+                usage["frames"] += 1
+                usage["memory_bytes" if entry["frame"] is not None else "spilled_bytes"] += entry["bytes"]
+            return {
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "frames": len(self._entries),
+                "spilled": sum(1 for e in self._entries.values() if e["frame"] is None),
+                "sessions": len(self._last_seen),
+                "spills": self.spills,
+                "reloads": self.reloads,
+                "evicted_sessions": self.evicted_sessions,
+                "per_session": sorted(sessions.values(), key=lambda u: -u["memory_bytes"]),
+            }
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _process_spill_dir():
+    """
+    Pasta de despejo só deste processo, dentro de spill_dir.
+
+    Vários processos do app no mesmo servidor compartilham spill_dir; cada um
+    usa uma subpasta "<pid>-..." e só apaga a sua (ao sair) ou as de
+    processos que já não existem.
+    """
+    base = Path(setting("spill_dir", str(Path(tempfile.gettempdir()) / "swe-spill")))
+    base.mkdir(parents=True, exist_ok=True)
+    for old in base.iterdir():
+        pid = old.name.split("-", 1)[0]
+        if old.is_dir() and pid.isdigit() and not _pid_alive(int(pid)):
+            shutil.rmtree(old, ignore_errors=True)
+    path = Path(tempfile.mkdtemp(prefix=f"{os.getpid()}-", dir=base))
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return path
+
+
+@st.cache_resource(show_spinner=False)
+def get_session_frames():
+    """Gerenciador único do processo, compartilhado por todas as sessões."""
+    spill_dir = _process_spill_dir()
+    return SessionFrames(
+        max_bytes    = setting("session_memory_mb", 1024) * 1024 * 1024,
+        spill_dir    = spill_dir,
+        idle_timeout = setting("session_idle_timeout", 2 * 3600),
+    )
+
+
+# --- Atalhos para as páginas -------------------------------------------------
+def _session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else "-"
+
+
+def put_frame(name, frame):
+    """Guarda um resultado da sessão atual (no lugar de st.session_state[name])."""
+    get_session_frames().put(_session_id(), name, frame)
+
+
+def get_frame(name):
+    """Resultado `name` da sessão atual, relido do disco se tiver sido despejado; None se não houver."""
+    return get_session_frames().get(_session_id(), name)
@@ -0,0 +1,141 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+import streamlit as st
+
+from dados.config import setting
+
+
+# Um evento JSON por linha neste logger; basta apontá-lo para um arquivo ou
+# coletor para ter o histórico completo, além do que fica em memória.
+logger = logging.getLogger("swe.metricas")
+
+_context = threading.local()
+
+
+# --- Memória do processo -----------------------------------------------------
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes():
+    """Memória residente do processo (0 onde /proc não existe)."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+# --- Armazenamento -----------------------------------------------------------
+class Metrics:
+    """
+    Eventos recentes e latências por (página, etapa), em memória.
+
+    Guarda os últimos `history` eventos e, por etapa, as últimas `window`
+    durações, de onde saem p50/p95/p99.
+    """
+
+    def __init__(self, history=2000, window=1000):
+        self._lock = threading.Lock()
+        self.events = deque(maxlen=history)
+        self._window = window
+        self._latencies = defaultdict(lambda: deque(maxlen=self._window))
+
+    def add(self, event):
+        with self._lock:
+            self.events.append(event)
+            self._latencies[(event["page"], event["stage"])].append(event["ms"])
+
+    def percentiles(self):
+        """Lista de dicts: página, etapa, n, p50, p95, p99 e máximo (ms)."""
+        with self._lock:
+            items = [(key, np.array(values)) for key, values in self._latencies.items()]
+        rows = []
+        for (page, stage), values in sorted(items):
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            rows.append({
+                "page": page, "stage": stage, "n": len(values),
+                "p50_ms": round(p50, 1), "p95_ms": round(p95, 1),
+                "p99_ms": round(p99, 1), "max_ms": round(values.max(), 1),
+            })
+        return rows
+
+    def recent(self, n=200):
+        with self._lock:
+            return list(self.events)[-n:][::-1]
+
+    def clear(self):
+        with self._lock:
+            self.events.clear()
+            self._latencies.clear()
+
+
+@st.cache_resource(show_spinner=False)
+def get_metrics():
+    """Métricas do processo, compartilhadas por todas as sessões."""
+    return Metrics(
+        history = setting("metrics_history", 2000),
+        window  = setting("metrics_window", 1000),
+    )
+
+
+# --- Contexto e registro -----------------------------------------------------
+def current_page():
+    return getattr(_context, "page", None)
+
+
+def set_page(page):
+    """Página à qual os eventos desta thread são atribuídos."""
+    _context.page = page
+
+
+def record(stage, ms, **fields):
+    """Registra um evento já medido."""
+    event = {"ts": round(time.time(), 3), "page": current_page() or "-", "stage": stage, "ms": round(ms, 2)}
+    event.update(fields)
+    get_metrics().add(event)
+    logger.info(json.dumps(event, default=str, ensure_ascii=False))
+
+
+@contextmanager
+def timed(stage, **fields):
+    """
+    Mede o bloco e registra um evento `stage` com duração, variação de
+    memória residente e os campos extras. O dict entregue pelo `with` pode
+    receber mais campos (query_id, rows, bytes...) durante o bloco.
+    """
+    event = dict(fields)
+    rss = rss_bytes()
+    started = time.perf_counter()
+    try:
+        yield event
+    except BaseException as exc:
+        # st.rerun()/st.stop() também passam por aqui, mas não são falhas
+        if type(exc).__name__ not in ("RerunException", "StopException", "GeneratorExit"):
+            event["error"] = type(exc).__name__
+        raise
+    finally:
+        event["mem_delta_kb"] = (rss_bytes() - rss) // 1024
+        record(stage, (time.perf_counter() - started) * 1000, **event)
+
+
+# --- Acesso à página de diagnóstico ------------------------------------------
+def is_admin():
+    """
+    Usuário logado está em admin_emails (lista separada por vírgulas), ou
+    diagnostics_open está ligado (uso local).
+    """
+    if setting("diagnostics_open", False):
+        return True
+    admins = {e.strip().lower() for e in setting("admin_emails", "").split(",") if e.strip()}
+    try:
+        email = st.user.get("email")
+    except Exception:
+        email = None
+    return bool(email) and email.lower() in admins
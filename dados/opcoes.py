@@ -0,0 +1,46 @@
+import heapq
+
+import streamlit as st
+
+from dados.snapshot import current_version, load_table
+
+
+# --- Opções dos filtros ------------------------------------------------------
+# Lidas do snapshot local (dados/snapshot.py): preencher os multiselects não
+# retoma o warehouse.
+
+def get_cnae_options():
+    return sorted(load_table("TB_CNAE_DESCR")["CODIGO_DESCR"].dropna().unique())
+
+
+def get_uf_options():
+    return sorted(get_municipios_por_uf())
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _municipios_por_uf(version):
+    df = load_table("TB_UF_MUNICIPIO")[["UF", "MUNICIPIO"]].dropna().drop_duplicates()
+    return {
+        uf: tuple(sorted(group))
+        for uf, group in df.groupby("UF", sort=True)["MUNICIPIO"]
+    }
+
+
+def get_municipios_por_uf():
+    """
+    Mapa UF -> municípios (tupla ordenada), montado uma vez por versão dos
+    dados a partir das ~5.570 linhas de TB_UF_MUNICIPIO.
+    """
+    return _municipios_por_uf(current_version())
+
+
+def get_municipio_options(selected_ufs):
+    """Municípios das UFs selecionadas, em ordem e sem repetição, sem ir ao banco."""
+    by_uf = get_municipios_por_uf()
+    merged = heapq.merge(*(by_uf.get(uf, ()) for uf in selected_ufs))
+    options, last = [], None
+    for name in merged:
+        if name != last:
+            options.append(name)
+            last = name
+    return options
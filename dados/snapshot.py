@@ -0,0 +1,145 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+from dados.cache import data_version
+from dados.config import setting
+from dados.exportacao import write_parquet
+from dados.leitura import iter_arrow, read_frame
+
+
+logger = logging.getLogger(__name__)
+
+# Tabelas pequenas que só mudam a cada carga da RFB
+SNAPSHOT_TABLES = ("TB_CNAE_DESCR", "TB_UF_MUNICIPIO", "TB_CNAE_UF", "TB_CNAE_UF_MUNICIPIO")
+
+_refresh_lock = threading.Lock()
+
+
+# --- Snapshot local ----------------------------------------------------------
+def snapshot_dir():
+    default = Path(__file__).resolve().parent.parent / ".snapshot"
+    return Path(setting("snapshot_dir", str(default)))
+
+
+def version_dir(version):
+    """Pasta do snapshot de uma versão dos dados ("v-<hash>")."""
+    return snapshot_dir() / f"v-{hashlib.sha1(str(version).encode()).hexdigest()[:12]}"
+
+
+def local_version():
+    """Versão dos dados do snapshot local em uso (None se não houver)."""
+    root = snapshot_dir()
+    try:
+        current = (root / "CURRENT").read_text(encoding="utf-8").strip()
+        return json.loads((root / current / "version.json").read_text(encoding="utf-8"))["version"]
+    except (FileNotFoundError, KeyError, json.JSONDecodeError):
+        return None
+
+
+def refresh_snapshot(version, tables=SNAPSHOT_TABLES):
+    """
+    Copia as tabelas do Snowflake para arquivos Parquet locais.
+
+    Cada versão tem a sua pasta, e o arquivo CURRENT diz qual está em uso.
+    A pasta é gravada por inteiro antes de ser publicada e CURRENT é trocado
+    com os.replace, que é atômico; assim vários processos do app podem
+    atualizar o snapshot ao mesmo tempo sem que ninguém veja uma pasta pela
+    metade ou fique sem snapshot. Fica também a versão anterior, para quem
+    ainda estiver lendo; as mais antigas são apagadas, menos as gravadas há
+    pouco (que outro processo pode estar publicando agora).
+    """
+    root = snapshot_dir()
+    staging = root / f"staging-{os.getpid()}-{threading.get_ident()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    for table in tables:
+        write_parquet(staging / f"{table}.parquet", iter_arrow(f"SELECT * FROM {table}"))
+    (staging / "version.json").write_text(json.dumps({"version": version}), encoding="utf-8")
+
+    target = version_dir(version)
+    try:
+        staging.rename(target)
+    except OSError:
+        # outro processo publicou a mesma versão primeiro
+        shutil.rmtree(staging, ignore_errors=True)
+        if not (target / "version.json").exists():
+            raise
+
+    pointer = root / "CURRENT"
+    try:
+        previous = root / pointer.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        previous = None
+    partial = root / f"CURRENT.{os.getpid()}-{threading.get_ident()}.tmp"
+    partial.write_text(target.name, encoding="utf-8")
+    os.replace(partial, pointer)
+
+    keep = {target, previous, root / pointer.read_text(encoding="utf-8").strip()}
+    for old in root.glob("v-*"):
+        try:
+            recent = time.time() - old.stat().st_mtime < 600
+        except FileNotFoundError:   # apagada por outro processo
+            continue
+        if old not in keep and not recent:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def ensure_snapshot():
+    """
+    Garante um snapshot local na versão atual dos dados e retorna a versão.
+
+    A versão remota vem do SHOW TABLES (data_version), que não retoma o
+    warehouse. Se o Snowflake estiver inacessível, segue com o snapshot que
+    existir.
+    """
+    try:
+        version = data_version()
+    except Exception:
+        version = local_version()
+        if version is None:
+            raise
+        logger.warning("Snowflake inacessível; usando snapshot local %s", version)
+        return version
+    if local_version() != version:
+        with _refresh_lock:
+            if local_version() != version:
+                refresh_snapshot(version)
+    return version
+
+
+@st.cache_data(show_spinner=False)
+def _read_snapshot_table(name, version):
+    return pd.read_parquet(version_dir(version) / f"{name}.parquet")
+
+
+def current_version():
+    """Versão dos dados servida por load_table (útil como chave de cache)."""
+    if not setting("snapshot_enabled", True):
+        return data_version()
+    return ensure_snapshot()
+
+
+def load_table(name):
+    """
+    Tabela de dimensão/agregado inteira como DataFrame.
+
+    Com snapshot_enabled (padrão), lê do snapshot local em Parquet; sem ele,
+    consulta o Snowflake como antes.
+    """
+    if not setting("snapshot_enabled", True):
+        return _read_remote_table(name, current_version())
+    return _read_snapshot_table(name, current_version())
+
+
+@st.cache_data(show_spinner=False)
+def _read_remote_table(name, version):
+    return read_frame(f"SELECT * FROM {name}")
@@ -0,0 +1,147 @@
+import json
+import re
+
+from dados.execucao import run_statement
+
+
+# --- Montagem de SQL parametrizado ------------------------------------------
+# Todo valor vindo da tela vai como bind variable (paramstyle qmark, com
+# binding no servidor). O texto do SQL não muda com o conteúdo dos filtros,
+# só com o formato deles, o que permite ao Snowflake reaproveitar o plano e o
+# cache de resultados, e elimina qualquer risco de injeção.
+
+IN_LIST_MAX = 64          # até aqui: col IN (?, ?, ...)
+TEMP_TABLE_MIN = 10_000   # a partir daqui: junção com tabela temporária
+
+
+def _bucket(n):
+    """Menor potência de 2 >= n."""
+    size = 1
+    while size < n:
+        size *= 2
+    return size
+
+
+class Query:
+    """
+    SELECT parametrizado com filtros IN de qualquer tamanho.
+
+    Listas de tamanhos diferentes recaem em poucas formas de texto:
+      - até IN_LIST_MAX valores: `col IN (?, ...)` com a lista completada,
+        repetindo o último valor, até a próxima potência de 2;
+      - até TEMP_TABLE_MIN valores: um único bind com o array em JSON,
+        expandido por FLATTEN;
+      - acima disso: os valores entram por array binding (executemany) numa
+        tabela temporária da sessão, e o filtro vira uma subconsulta nela.
+    """
+
+    def __init__(self, select, table):
+        self.select = select
+        self.table = table
+        self.clauses = []
+        self.params = []
+        self.temp_tables = []   # (nome, valores) a carregar antes da consulta
+        self.order = None
+        self.limit_value = None
+        self.offset_value = None
+
+    def where(self, clause, *params):
+        self.clauses.append(clause)
+        self.params.extend(params)
+        return self
+
+    def where_in(self, column, values):
+        values = list(values)
+        if not values:
+            return self
+        if len(values) <= IN_LIST_MAX:
+            size = _bucket(len(values))
+            values += [values[-1]] * (size - len(values))
+            return self.where(f"{column} IN ({', '.join(['?'] * size)})", *values)
+        if len(values) < TEMP_TABLE_MIN:
+            return self.where(
+                f"{column} IN (SELECT VALUE::STRING FROM TABLE(FLATTEN(INPUT => PARSE_JSON(?))))",
+                json.dumps(values),
+            )
+        name = f"SWE_IN_{len(self.temp_tables)}"
+        self.temp_tables.append((name, values))
+        return self.where(f"{column} IN (SELECT V FROM {name})")
+
+    def where_ranges(self, column, ranges):
+        """
+        `col BETWEEN ? AND ?` para cada faixa (inicio, fim), unidas por OR.
+
+        Como em where_in, a lista é completada até a próxima potência de 2
+        repetindo a última faixa. Só para poucas faixas (até IN_LIST_MAX).
+        """
+        ranges = list(ranges)
+        if not ranges:
+            return self
+        size = _bucket(len(ranges))
+        ranges += [ranges[-1]] * (size - len(ranges))
+        clause = " OR ".join([f"{column} BETWEEN ? AND ?"] * size)
+        return self.where(f"({clause})", *(v for r in ranges for v in r))
+
+    def order_by(self, expr):
+        self.order = expr
+        return self
+
+    def limit(self, n, offset=0):
+        self.limit_value = n
+        self.offset_value = offset or None
+        return self
+
+    def build(self):
+        """Retorna (sql, params)."""
+        sql = f"SELECT {self.select} FROM {self.table}"
+        params = list(self.params)
+        if self.clauses:
+            sql += " WHERE " + " AND ".join(self.clauses)
+        if self.order:
+            sql += f" ORDER BY {self.order}"
+        if self.limit_value is not None:
+            sql += " LIMIT ?"
+            params.append(self.limit_value)
+            if self.offset_value:
+                sql += " OFFSET ?"
+                params.append(self.offset_value)
+        return sql, params
+
+
+def result_scan(query_id):
+    """
+    Tabela com o resultado persistido da consulta `query_id`, para usar como
+    `table` de uma Query.
+
+    O Snowflake guarda o resultado de cada consulta por 24 horas; lê-lo com
+    RESULT_SCAN não refaz os filtros sobre a tabela de origem. O id não pode
+    ir como bind variable aqui, por isso é validado antes de entrar no texto.
+    """
+    if not re.fullmatch(r"[0-9a-fA-F-]{36}", query_id):
+        raise ValueError(f"Id de consulta inválido: {query_id!r}")
+    return f"TABLE(RESULT_SCAN('{query_id}'))"
+
+
+def execute(cur, query, params=None, timeout=None):
+    """
+    Executa uma Query (ou SQL puro com `params`) no cursor.
+
+    As tabelas temporárias da Query são criadas e carregadas antes, com
+    array binding, na mesma sessão. Dentro de uma pesquisa em segundo plano
+    (dados.execucao.Job) a consulta principal vai com execute_async e pode
+    ser cancelada. `timeout` (segundos) aborta a consulta principal.
+    """
+    if not isinstance(query, Query):
+        return run_statement(cur, query, params, timeout)
+    for name, values in query.temp_tables:
+        cur.execute(f"CREATE OR REPLACE TEMPORARY TABLE {name} (V VARCHAR)")
+        cur.executemany(f"INSERT INTO {name} (V) VALUES (?)", [(v,) for v in values])
+    sql, params = query.build()
+    return run_statement(cur, sql, params, timeout)
+
+
+def cleanup(cur, query):
+    """Remove as tabelas temporárias criadas por execute()."""
+    if isinstance(query, Query):
+        for name, _ in query.temp_tables:
+            cur.execute(f"DROP TABLE IF EXISTS {name}")
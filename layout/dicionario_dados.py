@@ -47,9 +47,9 @@ def main():
         # carrega o JSON
     layout = load_layout()
 
-        # 1) Se for um mapeamento simples chave->valor, vira um DF de duas colunas
+        # 1) Cada variável tem descrição e tipo; aqui exibimos a descrição
     df_kv = pd.DataFrame(
-            list(layout.items()),
+            [(nome, meta["descricao"]) for nome, meta in layout.items()],
             columns=['Variável', 'Descrição']
     )
 
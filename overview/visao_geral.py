@@ -1,90 +1,20 @@
 import streamlit as st
-import pandas as pd
-import snowflake.connector
 import altair as alt
 
+from dados.agregados import get_overview_index, load_overview_counts
+
 st.set_page_config(
     page_title="Visão Geral - Sistema Web Empresa", 
     page_icon="logo_fgv.png"
 )
 
-# --- Conexão com o banco ---------------------------------------------------
-def get_connection():
-    """
-    Estabelece e retorna a conexão com o Snowflake
-    utilizando os dados configurados em st.secrets.
-    """
-    return snowflake.connector.connect(
-        account   = st.secrets["snowflake"]["account"],
-        user      = st.secrets["snowflake"]["user"],
-        password  = st.secrets["snowflake"]["password"],
-        warehouse = st.secrets["snowflake"]["warehouse"],
-        database  = st.secrets["snowflake"]["database"],
-        schema    = st.secrets["snowflake"]["schema"],
-    )
-
-# --- Queries e cache -------------------------------------------------------
-@st.cache_data(show_spinner=False)
-def load_overview_counts():
-    """
-    Retorna os principais totais:
-      - tot_count: total de empresas ativas
-      - subclasses: número de subclasses CNAE
-      - estados: número de estados + DF
-      - municipios: número de municípios
-    """
-    conn = get_connection()
-    cur = conn.cursor()
-    # totais
-    cur.execute("SELECT COUNT(*) FROM TB_MVP_CONS")
-    tot_count = cur.fetchone()[0]
-    # subclasses
-    cur.execute("SELECT COUNT(DISTINCT CODIGO_DESCR) FROM TB_CNAE_DESCR")
-    subclasses = cur.fetchone()[0]
-    # estados
-    cur.execute("SELECT COUNT(DISTINCT UF) FROM TB_UF_MUNICIPIO")
-    estados = cur.fetchone()[0]
-    # municipios
-    cur.execute("SELECT COUNT(DISTINCT MUNICIPIO) FROM TB_UF_MUNICIPIO")
-    municipios = cur.fetchone()[0]
-    cur.close()
-    conn.close()
-    return tot_count, subclasses, estados, municipios
-
-@st.cache_data(show_spinner=False)
-def load_count1():
-    """
-    Retorna DataFrame com contagem de empresas por (cnae_descr, uf).
-    """
-    conn = get_connection()
-    query = """
-      SELECT * FROM TB_CNAE_UF
-    """
-    df = pd.read_sql(query, conn)
-    conn.close()
-    return df
-
-@st.cache_data(show_spinner=False)
-def load_count2():
-    """
-    Retorna DataFrame com contagem de empresas por (cnae_descr, uf, municipio).
-    """
-    conn = get_connection()
-    query = """
-      SELECT * FROM TB_CNAE_UF_MUNICIPIO
-    """
-    df = pd.read_sql(query, conn)
-    conn.close()
-    return df
-
 # --- App principal ---------------------------------------------------------
 def main():
     st.title("Overview: Empresas Ativas")
 
     # carrega os dados
     tot_count, subclasses, estados, municipios = load_overview_counts()
-    df1 = load_count1()
-    df2 = load_count2()
+    index = get_overview_index()
 
     # --- Métricas no topo ----------------------------------------------
     col1, col2, col3, col4 = st.columns(4)
@@ -124,16 +54,10 @@ def main():
     st.caption("Os dez estados mais representativos por atividade econômica.")
 
     # filtro de CNAE
-    df1 = df1.dropna()
-    cnae_list = sorted(df1["CNAE_DESCR"].unique())
-    sel_cnae = st.selectbox("Selecione CNAE:", cnae_list, index=0)
+    sel_cnae = st.selectbox("Selecione CNAE:", index.cnae_list, index=0)
 
-    # prepara dados e plot
-    top_uf = (
-        df1[df1["CNAE_DESCR"] == sel_cnae]
-        .nlargest(10, "COUNTER")
-        .rename(columns={"UF": "Estado", "COUNTER": "Nº Empresas Ativas"})
-    )
+    # prepara dados e plot (top 10 já calculado por CNAE)
+    top_uf = index.top_ufs(sel_cnae)
     if not top_uf.empty:
         chart = (
             alt.Chart(top_uf)
@@ -156,17 +80,12 @@ def main():
     st.caption("Os municípios mais representativos por atividade econômica.")
 
     # filtro de UF
-    uf_list = sorted(df2["UF"].unique())
-    sel_uf = st.selectbox("Selecione UF:", uf_list, index=0)
+    sel_uf = st.selectbox("Selecione UF:", index.uf_list, index=0)
 
-    # filtra e exibe tabela
-    df_mun = (
-        df2[(df2["CNAE_DESCR"] == sel_cnae) & (df2["UF"] == sel_uf)]
-        .sort_values("COUNTER", ascending=False)
-        .rename(columns={"CNAE_DESCR":"Atividade Realizada","MUNICIPIO": "Município", "COUNTER": "Nº Empresas Ativas"})
-    )
+    # exibe tabela (municípios já ordenados por COUNTER para cada CNAE x UF)
+    df_mun = index.municipios(sel_cnae, sel_uf)
     if not df_mun.empty:
-        st.dataframe(df_mun[["Atividade Realizada","Município", "Nº Empresas Ativas"]])
+        st.dataframe(df_mun)
     else:
         st.info("Nenhum município encontrado para essa combinação.")
 